@@ -1,27 +1,36 @@
-import open3d as o3d
-import numpy as np
-from copy import deepcopy
+import argparse
 import os
 
-# File path to your OBJ model
-model_path = r"C:\Users\saila\OneDrive\Рабочий стол\Data\uploads_files_2787791_Mercedes+Benz+GLS+580.obj"
-
-# Convert path to use short filename (8.3 format) to avoid Unicode issues
-try:
-    # Try to get the short path name for Windows
-    import ctypes
-    from ctypes import wintypes
-    
-    GetShortPathName = ctypes.windll.kernel32.GetShortPathNameW
-    GetShortPathName.argtypes = [wintypes.LPCWSTR, wintypes.LPWSTR, wintypes.DWORD]
-    GetShortPathName.restype = wintypes.DWORD
-    
-    buffer = ctypes.create_unicode_buffer(260)
-    GetShortPathName(model_path, buffer, 260)
-    model_path = buffer.value
-except:
-    # Fallback: use the path as is
-    pass
+import open3d as o3d
+
+from mesh_pipeline import (DEFAULT_OPTIONS, clip_stage, gradient_stage, load_stage, lod_stage,
+                           point_cloud_stage, poisson_stage, voxelize_stage)
+from mesh_processing import uniform_colors, vertex_colors
+
+# File path to your OBJ model (override with the first argument or MODEL_PATH)
+DEFAULT_MODEL_PATH = r"C:\Users\saila\OneDrive\Рабочий стол\Data\uploads_files_2787791_Mercedes+Benz+GLS+580.obj"
+
+parser = argparse.ArgumentParser(description="Assignment #5: 3D model processing with Open3D")
+parser.add_argument("model_path", nargs="?", default=os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH))
+parser.add_argument("--no-gui", action="store_true", help="skip the viewer windows (see mesh_pipeline.py for batches)")
+parser.add_argument("--preview", action="store_true", help="fast Poisson on a downsampled cloud")
+args = parser.parse_args()
+
+ctx = {"model_path": args.model_path, "output_dir": None}
+opts = {**DEFAULT_OPTIONS, "write_outputs": False, "quality": "preview" if args.preview else "final",
+        "voxel_grid": not args.no_gui}
+
+
+def show(geometries, window_name, mesh_colors=None):
+    """Open a viewer window; ``mesh_colors`` temporarily recolors the loaded mesh."""
+    if args.no_gui:
+        return
+    if mesh_colors is None:
+        o3d.visualization.draw_geometries(geometries, window_name=window_name)
+        return
+    with vertex_colors(ctx["mesh"], mesh_colors):
+        o3d.visualization.draw_geometries(geometries, window_name=window_name)
+
 
 print("=" * 60)
 print("ASSIGNMENT #5: 3D MODEL PROCESSING WITH OPEN3D")
@@ -33,8 +42,8 @@ print("=" * 60)
 print("\n[STEP 1] LOADING AND VISUALIZATION")
 print("-" * 60)
 
-mesh = o3d.io.read_triangle_mesh(model_path)
-mesh.compute_vertex_normals()
+load_stage(ctx, opts)
+mesh = ctx["mesh"]
 
 print(f"✓ Model loaded successfully")
 print(f"  • Number of vertices: {len(mesh.vertices)}")
@@ -43,7 +52,7 @@ print(f"  • Has vertex colors: {mesh.has_vertex_colors()}")
 print(f"  • Has vertex normals: {mesh.has_vertex_normals()}")
 
 # Visualize original mesh
-o3d.visualization.draw_geometries([mesh], window_name="Step 1: Original Mesh")
+show([mesh], "Step 1: Original Mesh")
 
 # ============================================================================
 # STEP 2: Conversion to Point Cloud
@@ -51,18 +60,15 @@ o3d.visualization.draw_geometries([mesh], window_name="Step 1: Original Mesh")
 print("\n[STEP 2] CONVERSION TO POINT CLOUD")
 print("-" * 60)
 
-# Convert mesh to point cloud
-pcd = o3d.geometry.PointCloud()
-pcd.points = mesh.vertices
-if mesh.has_vertex_colors():
-    pcd.colors = mesh.vertex_colors
+point_cloud_stage(ctx, opts)
+pcd = ctx["pcd"]
 
 print(f"✓ Converted mesh to point cloud")
 print(f"  • Number of vertices (points): {len(pcd.points)}")
 print(f"  • Has colors: {pcd.has_colors()}")
 
 # Visualize point cloud
-o3d.visualization.draw_geometries([pcd], window_name="Step 2: Point Cloud")
+show([pcd], "Step 2: Point Cloud")
 
 # ============================================================================
 # STEP 3: Surface Reconstruction from Point Cloud
@@ -70,27 +76,19 @@ o3d.visualization.draw_geometries([pcd], window_name="Step 2: Point Cloud")
 print("\n[STEP 3] SURFACE RECONSTRUCTION (POISSON)")
 print("-" * 60)
 
-# Estimate normals for Poisson reconstruction
-pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(
-    radius=0.1, max_nn=30))
-
-# Poisson surface reconstruction
-mesh_poisson, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
-    pcd, depth=9)
-
-# Create bounding box for cropping
-bbox = pcd.get_axis_aligned_bounding_box()
-bbox = bbox.scale(1.1, center=bbox.get_center())
-mesh_reconstructed = mesh_poisson.crop(bbox)
+# Normals are estimated once on the level-of-detail clouds
+lod_stage(ctx, opts)
+poisson = poisson_stage(ctx, opts)
+mesh_reconstructed = ctx["reconstructed"]
 
 print(f"✓ Surface reconstructed using Poisson method")
+print(f"  • Quality: {poisson['quality']} ({poisson['points']} points, depth {poisson['depth']})")
 print(f"  • Number of vertices: {len(mesh_reconstructed.vertices)}")
 print(f"  • Number of triangles: {len(mesh_reconstructed.triangles)}")
 print(f"  • Has vertex colors: {mesh_reconstructed.has_vertex_colors()}")
 
 # Visualize reconstructed mesh
-o3d.visualization.draw_geometries([mesh_reconstructed], 
-                                 window_name="Step 3: Poisson Reconstructed Mesh")
+show([mesh_reconstructed], "Step 3: Poisson Reconstructed Mesh")
 
 # ============================================================================
 # STEP 4: Voxelization
@@ -98,16 +96,19 @@ o3d.visualization.draw_geometries([mesh_reconstructed],
 print("\n[STEP 4] VOXELIZATION")
 print("-" * 60)
 
-voxel_size = 0.5
-voxel_grid = o3d.geometry.VoxelGrid.create_from_point_cloud(pcd, voxel_size)
+voxel_stats = voxelize_stage(ctx, opts)
+voxel_grid = ctx.get("voxel_grid")
 
 print(f"✓ Voxelization completed")
-print(f"  • Voxel size: {voxel_size}")
-print(f"  • Number of voxels: {len(voxel_grid.get_voxels())}")
-print(f"  • Has colors: {voxel_grid.has_colors()}")
+print(f"  • Voxel size: {voxel_stats['voxel_size']}")
+print(f"  • Number of voxels: {voxel_stats['voxels']}")
+print(f"  • Points per voxel: {voxel_stats['mean_points_per_voxel']:.1f} avg, "
+      f"{voxel_stats['max_points_per_voxel']} max")
 
 # Visualize voxel grid
-o3d.visualization.draw_geometries([voxel_grid], window_name="Step 4: Voxel Grid")
+if voxel_grid is not None:
+    print(f"  • Has colors: {voxel_grid.has_colors()}")
+    show([voxel_grid], "Step 4: Voxel Grid")
 
 # ============================================================================
 # STEP 5: Adding a Plane
@@ -117,7 +118,7 @@ print("-" * 60)
 
 # Get mesh center and dimensions
 mesh_center = mesh.get_center()
-vertices_array = np.asarray(mesh.vertices)
+vertices_array = ctx["vertices"]
 x_min, y_min, z_min = vertices_array.min(axis=0)
 x_max, y_max, z_max = vertices_array.max(axis=0)
 
@@ -127,18 +128,14 @@ plane_mesh = o3d.geometry.TriangleMesh.create_box(width=0.5, height=plane_size,
 plane_mesh.translate([mesh_center[0] - 0.25, mesh_center[1] - plane_size/2, mesh_center[2] - plane_size/2])
 plane_mesh.paint_uniform_color([0.9, 0.2, 0.2])  # Red plane
 
-# Copy original mesh for visualization
-mesh_copy = deepcopy(mesh)
-mesh_copy.paint_uniform_color([0.3, 0.5, 0.9])  # Blue mesh
-
 print(f"✓ Cross-section plane created at middle")
 print(f"  • Plane position: X = {mesh_center[0]:.4f}")
 print(f"  • Plane dimensions: 0.5 x {plane_size:.4f} x {plane_size:.4f}")
 print(f"  • Mesh center: ({mesh_center[0]:.4f}, {mesh_center[1]:.4f}, {mesh_center[2]:.4f})")
 
-# Visualize mesh with plane
-o3d.visualization.draw_geometries([mesh_copy, plane_mesh], 
-                                 window_name="Step 5: Mesh with Cross-Section Plane")
+# Visualize mesh with plane (painted blue through a color array, not a mesh copy)
+show([mesh, plane_mesh], "Step 5: Mesh with Cross-Section Plane",
+     mesh_colors=uniform_colors(len(vertices_array), [0.3, 0.5, 0.9]))
 
 # ============================================================================
 # STEP 6: Surface Clipping
@@ -146,37 +143,11 @@ o3d.visualization.draw_geometries([mesh_copy, plane_mesh],
 print("\n[STEP 6] SURFACE CLIPPING")
 print("-" * 60)
 
-import open3d as o3d
-import numpy as np
-
 # Clip mesh: keep only points with X >= mesh_center[0] (right side of plane)
-vertices_array = np.asarray(mesh.vertices)
-triangles_array = np.asarray(mesh.triangles)
-
-# Get indices of vertices to keep
-keep_indices = np.where(vertices_array[:, 0] >= mesh_center[0])[0]
-keep_indices_set = set(keep_indices)
-
-# Create mapping from old indices to new indices
-index_mapping = {old_idx: new_idx for new_idx, old_idx in enumerate(keep_indices)}
-
-# Filter triangles: keep only those where all 3 vertices are in keep_indices
-valid_triangles = []
-for tri in triangles_array:
-    if all(idx in keep_indices_set for idx in tri):
-        # Remap triangle indices
-        new_tri = [index_mapping[idx] for idx in tri]
-        valid_triangles.append(new_tri)
-
-# Create new clipped mesh
-mesh_clipped = o3d.geometry.TriangleMesh()
-mesh_clipped.vertices = o3d.utility.Vector3dVector(vertices_array[keep_indices])
-
-if valid_triangles:
-    mesh_clipped.triangles = o3d.utility.Vector3iVector(np.array(valid_triangles))
-    mesh_clipped.compute_vertex_normals()
-    mesh_clipped.paint_uniform_color([0.3, 0.8, 0.3])  # Green clipped mesh
-else:
+clip_stage(ctx, {**opts, "clip_normal": [1.0, 0.0, 0.0], "clip_point": mesh_center})
+mesh_clipped = ctx["clipped"]
+
+if not len(mesh_clipped.triangles):
     print("⚠ Warning: No valid triangles after clipping")
 
 print(f"✓ Surface clipping completed (X >= {mesh_center[0]:.4f})")
@@ -186,7 +157,7 @@ print(f"  • Has vertex colors: {mesh_clipped.has_vertex_colors()}")
 print(f"  • Has vertex normals: {mesh_clipped.has_vertex_normals()}")
 
 # Visualize clipped mesh without plane
-o3d.visualization.draw_geometries([mesh_clipped], window_name="Step 6: Clipped Mesh (No Plane)")
+show([mesh_clipped], "Step 6: Clipped Mesh (No Plane)")
 
 # ============================================================================
 # STEP 7: Color Gradient and Extremes
@@ -194,33 +165,10 @@ o3d.visualization.draw_geometries([mesh_clipped], window_name="Step 6: Clipped M
 print("\n[STEP 7] COLOR GRADIENT AND EXTREMES")
 print("-" * 60)
 
-# Create a fresh copy for coloring
-mesh_colored = deepcopy(mesh)
-
-# Get vertex coordinates
-vertices = np.asarray(mesh_colored.vertices)
-
-# Apply gradient along Z axis
-z_coords = vertices[:, 2]
-z_min = z_coords.min()
-z_max = z_coords.max()
-
-# Normalize Z coordinates to [0, 1]
-z_normalized = (z_coords - z_min) / (z_max - z_min)
-
-# Create color map (blue to red gradient)
-colors = np.zeros((len(vertices), 3))
-colors[:, 0] = z_normalized  # Red channel increases with Z
-colors[:, 2] = 1 - z_normalized  # Blue channel decreases with Z
-
-mesh_colored.vertex_colors = o3d.utility.Vector3dVector(colors)
-
-# Find extreme points
-min_idx = np.argmin(z_coords)
-max_idx = np.argmax(z_coords)
-
-min_point = vertices[min_idx]
-max_point = vertices[max_idx]
+# Apply gradient along Z axis (blue to red)
+gradient = gradient_stage(ctx, {**opts, "gradient_axis": 2})
+z_min, z_max = gradient["min"], gradient["max"]
+min_point, max_point = gradient["min_point"], gradient["max_point"]
 
 print(f"✓ Color gradient applied (Z-axis based)")
 print(f"  • Gradient range: Blue (Z-min) → Red (Z-max)")
@@ -244,9 +192,9 @@ print(f"  • Sphere at min (blue, radius=2)")
 print(f"  • Sphere at max (red, radius=2)")
 
 # Visualize colored mesh with extreme points
-o3d.visualization.draw_geometries([mesh_colored, sphere_min, sphere_max], 
-                                 window_name="Step 7: Color Gradient with Extremes")
+show([mesh, sphere_min, sphere_max], "Step 7: Color Gradient with Extremes",
+     mesh_colors=ctx["gradient_colors"])
 
 print("\n" + "=" * 60)
 print("✓ ALL STEPS COMPLETED SUCCESSFULLY!")
-print("=" * 60)
\ No newline at end of file
+print("=" * 60)
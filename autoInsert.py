@@ -1,49 +1,129 @@
-import time
+import argparse
+import io
 import random
-import string
+import time
+import uuid
 import psycopg2
-from datetime import datetime
+from psycopg2.extras import execute_values
 from config import settings
 
-conn = psycopg2.connect(settings.DATABASE_URL)
-cursor = conn.cursor()
-
 categories = [ "moveis_decoracao", "papelaria"]
 
+PRODUCT_COLUMNS = (
+    "product_id",
+    "product_category_name",
+    "product_name_lenght",
+    "product_description_lenght",
+    "product_photos_qty",
+    "product_weight_g",
+    "product_length_cm",
+    "product_height_cm",
+    "product_width_cm",
+)
+
 def random_product_id():
-    return ''.join(random.choices(string.hexdigits.lower(), k=32))
-
-while True:
-    product_id = random_product_id()
-    category = random.choice(categories)
-    name_length = random.randint(35, 60)
-    desc_length = random.randint(200, 400)
-    photos_qty = random.randint(1, 5)
-    weight_g = random.randint(100, 2000)
-    length_cm = random.randint(10, 50)
-    height_cm = random.randint(5, 25)
-    width_cm = random.randint(10, 30)
-
-    cursor.execute("""
-        INSERT INTO olist_products (
-            product_id,
-            product_category_name,
-            product_name_lenght,
-            product_description_lenght,
-            product_photos_qty,
-            product_weight_g,
-            product_length_cm,
-            product_height_cm,
-            product_width_cm
+    return uuid.uuid4().hex
+
+def generate_products(count):
+    randint = random.randint
+    return [
+        (
+            random_product_id(),
+            random.choice(categories),
+            randint(35, 60),     # name length
+            randint(200, 400),   # description length
+            randint(1, 5),       # photos
+            randint(100, 2000),  # weight, g
+            randint(10, 50),     # length, cm
+            randint(5, 25),      # height, cm
+            randint(10, 30),     # width, cm
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, (
-        product_id, category, name_length, desc_length, photos_qty,
-        weight_g, length_cm, height_cm, width_cm
-    ))
+        for _ in range(count)
+    ]
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    text = str(value)
+    if any(ch in text for ch in "\\\t\n\r"):
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return text
+
+def copy_rows(cursor, table, columns, rows):
+    """Load rows with COPY FROM STDIN (text format)."""
+    buf = io.StringIO()
+    buf.writelines("\t".join(_copy_value(v) for v in row) + "\n" for row in rows)
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+def insert_rows(cursor, table, columns, rows, method="copy"):
+    if method == "copy":
+        copy_rows(cursor, table, columns, rows)
+    elif method == "values":
+        execute_values(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                       rows, page_size=len(rows))
+    elif method == "single":
+        placeholders = ",".join(["%s"] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+    else:
+        raise ValueError(f"Unknown ingest method '{method}' (expected copy, values or single)")
+
+def run_ingestion(batch_size=None, total_rows=None, target_rate=None, method=None):
+    """Insert synthetic products in batches, one commit per batch.
+
+    ``target_rate`` is in rows per second (0 = as fast as possible) and
+    ``total_rows`` = 0 runs until interrupted. Returns the achieved rows/s.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    total_rows = settings.INGEST_TOTAL_ROWS if total_rows is None else total_rows
+    target_rate = settings.INGEST_TARGET_RATE if target_rate is None else target_rate
+    method = method or settings.INGEST_METHOD
+
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    cursor = conn.cursor()
+
+    inserted = 0
+    started = time.perf_counter()
+    last_report = started
+    try:
+        while not total_rows or inserted < total_rows:
+            count = batch_size if not total_rows else min(batch_size, total_rows - inserted)
+            rows = generate_products(count)
+            insert_rows(cursor, "olist_products", PRODUCT_COLUMNS, rows, method)
+            conn.commit()
+            inserted += count
+
+            now = time.perf_counter()
+            if now - last_report >= settings.INGEST_REPORT_INTERVAL or count == 1:
+                last = rows[-1]
+                print(f" Inserted {inserted} products ({inserted / (now - started):.1f} rows/s), "
+                      f"last {last[0][:6]}... ({last[1]}) {last[5]}g {last[6]}x{last[8]}x{last[7]}cm")
+                last_report = now
+
+            if target_rate:
+                # Sleep until we are back on the target schedule.
+                ahead = inserted / target_rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    except KeyboardInterrupt:
+        conn.rollback()
+    finally:
+        cursor.close()
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = inserted / elapsed if elapsed else 0.0
+    print(f" Done: {inserted} rows in {elapsed:.1f}s ({rate:.1f} rows/s, method={method}, batch={batch_size})")
+    return rate
 
-    conn.commit()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Insert synthetic olist_products rows")
+    parser.add_argument("--batch-size", type=int, help="rows per batch / commit")
+    parser.add_argument("--rows", type=int, help="total rows to insert (0 = until interrupted)")
+    parser.add_argument("--rate", type=float, help="target rows per second (0 = unlimited)")
+    parser.add_argument("--method", choices=["copy", "values", "single"])
+    args = parser.parse_args(argv)
+    run_ingestion(args.batch_size, args.rows, args.rate, args.method)
 
-    print(f" Inserted product {product_id[:6]}... ({category}) " f"{weight_g}g {length_cm}x{width_cm}x{height_cm}cm")
-    
-    time.sleep(10)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark plane clipping: the original per-triangle loop vs mesh_processing.clip_arrays.
+
+Uses synthetic grid meshes so no model files or Open3D are needed:
+
+    python benchmarks/bench_clipping.py --triangles 100000 1000000 5000000
+
+The loop is only timed up to ``--loop-limit`` triangles (it takes minutes
+beyond that); both implementations are checked to produce the same mesh.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mesh_processing import clip_arrays  # noqa: E402
+
+
+def grid_mesh(n_triangles: int, seed: int = 0):
+    """A jittered square grid with roughly ``n_triangles`` triangles."""
+    side = max(2, int(np.sqrt(n_triangles / 2)) + 1)
+    rng = np.random.default_rng(seed)
+    xs, ys = np.meshgrid(np.linspace(-1, 1, side), np.linspace(-1, 1, side), indexing="ij")
+    vertices = np.column_stack([xs.ravel(), ys.ravel(), rng.normal(0, 0.01, side * side)])
+
+    idx = np.arange(side * side).reshape(side, side)
+    a, b = idx[:-1, :-1].ravel(), idx[1:, :-1].ravel()
+    c, d = idx[:-1, 1:].ravel(), idx[1:, 1:].ravel()
+    triangles = np.concatenate([np.column_stack([a, b, c]), np.column_stack([b, d, c])]).astype(np.int32)
+    return vertices, triangles
+
+
+def clip_loop(vertices, triangles, center_x):
+    """Step 6 of assignment5.py before vectorization (X >= center only)."""
+    keep_indices = np.where(vertices[:, 0] >= center_x)[0]
+    keep_indices_set = set(keep_indices)
+    index_mapping = {old_idx: new_idx for new_idx, old_idx in enumerate(keep_indices)}
+    valid_triangles = []
+    for tri in triangles:
+        if all(idx in keep_indices_set for idx in tri):
+            valid_triangles.append([index_mapping[idx] for idx in tri])
+    return vertices[keep_indices], np.array(valid_triangles, dtype=np.int64).reshape(-1, 3)
+
+
+def _measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mesh plane clipping")
+    parser.add_argument("--triangles", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--loop-limit", type=int, default=1_000_000,
+                        help="skip the Python loop above this many triangles")
+    args = parser.parse_args()
+
+    print(f"{'triangles':>11} {'loop s':>9} {'loop MB':>9} {'numpy s':>9} {'numpy MB':>9} {'speedup':>9}")
+    for n in args.triangles:
+        vertices, triangles = grid_mesh(n)
+        center = vertices.mean(axis=0)
+
+        (v_fast, t_fast, _, _), fast_s, fast_mb = _measure(
+            clip_arrays, vertices, triangles, [1.0, 0.0, 0.0], center)
+
+        loop_s = loop_mb = speedup = float("nan")
+        if len(triangles) <= args.loop_limit:
+            (v_loop, t_loop), loop_s, loop_mb = _measure(clip_loop, vertices, triangles, center[0])
+            if not (np.array_equal(v_loop, v_fast) and np.array_equal(t_loop, t_fast)):
+                sys.exit(f"Mismatch between loop and vectorized clipping at {len(triangles)} triangles")
+            speedup = loop_s / fast_s
+
+        print(f"{len(triangles):>11} {loop_s:>9.3f} {loop_mb:>9.1f} {fast_s:>9.4f} {fast_mb:>9.1f} {speedup:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Benchmark the report queries at one or more data scales.
+
+Runs every query from pevious_tasks/analytics.py (REPORTS),
+pevious_tasks/sql/queries.sql and pevious_tasks/queries.py directly against
+Postgres, bypassing the result cache and rollups, and writes a JSON file
+that can be compared between commits.
+
+    python benchmarks/bench_reports.py --scale 1x=postgresql://.../olist --scale 10x=postgresql://.../olist_10x
+    python benchmarks/bench_reports.py compare bench_results/old.json bench_results/new.json
+
+Each scale is a separate database, e.g. loaded with workload_generator.py.
+Per query it records p50/p95 latency over ``--repeat`` runs, rows returned,
+shared buffer hits/reads from one EXPLAIN (ANALYZE, BUFFERS) run, the Python
+allocation peak while fetching (tracemalloc) and the peak RSS while running
+that query. The peak is reset per query through /proc/self/clear_refs; where
+that is unavailable the value is the cumulative process peak, as recorded
+in ``peak_rss_scope``. For analytics reports with a chart the render time is
+recorded as well.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "pevious_tasks")]
+
+import psycopg2  # noqa: E402
+
+from config import settings  # noqa: E402
+from mesh_pipeline import peak_rss_mb, reset_peak_rss  # noqa: E402
+from query_plans import explain_analyze, summarize_plan  # noqa: E402
+
+
+def collect_queries():
+    """All benchmarked queries as dicts with source, description, query and chart_type."""
+    import analytics
+    import main as sql_script
+    import queries as trend
+
+    items = []
+    for report in analytics.REPORTS:
+        items.append({"source": "analytics.py", "description": report["description"],
+                      "query": report["query"], "report": report})
+    for description, query in sql_script.load_queries():
+        items.append({"source": "sql/queries.sql", "description": description, "query": query})
+    items.append({"source": "queries.py", "description": "Hourly orders and revenue", "query": trend.query})
+    return items
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run(conn, query):
+    with conn.cursor() as cur:
+        cur.execute(query)
+        rows = cur.fetchall()
+        headers = [desc[0] for desc in cur.description]
+    conn.rollback()
+    return rows, headers
+
+
+def _render_time(report, rows, headers):
+    from chart_data import numpy_histogram
+    from chart_rendering import chart_filename, render_chart
+
+    columns = list(zip(*rows))
+    if report["chart_type"] == "hist" and len(columns) < 3:
+        # Raw values, binned as DatabaseAnalytics does without pushdown.
+        columns = numpy_histogram(columns[0], report.get("bins", settings.CHART_HIST_BINS))
+    with tempfile.TemporaryDirectory() as charts_dir:
+        filename = chart_filename(charts_dir, report["description"])
+        started = time.perf_counter()
+        render_chart(filename, headers, report["description"], report["chart_type"], columns)
+        return time.perf_counter() - started
+
+
+def bench_query(conn, item, repeat, warmup):
+    per_query_peak = reset_peak_rss()
+    for _ in range(warmup):
+        _run(conn, item["query"])
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows, headers = _run(conn, item["query"])
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    _run(conn, item["query"])
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    plan = summarize_plan(explain_analyze(conn, item["query"]))
+    result = {
+        "source": item["source"],
+        "description": item["description"],
+        "rows": len(rows),
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": _percentile(timings, 95) * 1000,
+        "min_ms": min(timings) * 1000,
+        "shared_hit_blocks": plan["shared_hit_blocks"],
+        "shared_read_blocks": plan["shared_read_blocks"],
+        "py_peak_alloc_mb": py_peak / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_scope": "query" if per_query_peak else "process",
+    }
+    report = item.get("report")
+    if report and report.get("chart_type") and rows:
+        result["render_ms"] = _render_time(report, rows, headers) * 1000
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(scales, repeat, warmup, output_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+
+    items = collect_queries()
+    results = []
+    for scale, dsn in scales:
+        print(f"\n=== Scale {scale} ===")
+        conn = psycopg2.connect(dsn)
+        try:
+            for item in items:
+                try:
+                    result = bench_query(conn, item, repeat, warmup)
+                except Exception as e:
+                    conn.rollback()
+                    print(f"  ✗ {item['description']}: {e}")
+                    continue
+                result["scale"] = scale
+                results.append(result)
+                print(f"  {result['p50_ms']:9.1f} ms p50 {result['p95_ms']:9.1f} ms p95 "
+                      f"{result['rows']:>8} rows  {item['source']}: {item['description']}")
+        finally:
+            conn.close()
+
+    revision = _git_revision()
+    document = {
+        "revision": revision,
+        "recorded_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "scales": [scale for scale, _ in scales],
+        "results": results,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{datetime.now():%Y%m%dT%H%M%S}-{revision}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults written to {path}")
+    return path
+
+
+def compare(base_path, new_path, threshold):
+    """Print p50 changes per query; returns the number of regressions above ``threshold``."""
+    with open(base_path, encoding="utf-8") as f:
+        base = {(r["scale"], r["source"], r["description"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    for result in new:
+        key = (result["scale"], result["source"], result["description"])
+        if key not in base:
+            continue
+        before, after = base[key]["p50_ms"], result["p50_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{result['scale']:>6} {before:9.1f} -> {after:9.1f} ms ({change:+.0%})  "
+              f"{result['source']}: {result['description']}{flag}")
+    print(f"\n{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        parser = argparse.ArgumentParser(prog="bench_reports.py compare")
+        parser.add_argument("base")
+        parser.add_argument("new")
+        parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown (0.2 = 20%%)")
+        args = parser.parse_args(sys.argv[2:])
+        sys.exit(1 if compare(args.base, args.new, args.threshold) else 0)
+
+    parser = argparse.ArgumentParser(description="Benchmark the report queries")
+    parser.add_argument("--scale", action="append", metavar="NAME=DSN",
+                        help="data scale and its database URL (repeatable); defaults to config settings")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output-dir", default=os.path.join(ROOT, "bench_results"))
+    args = parser.parse_args()
+
+    scales = [tuple(s.split("=", 1)) for s in args.scale] if args.scale else [("current", settings.DATABASE_URL)]
+    run_benchmarks(scales, args.repeat, args.warmup, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
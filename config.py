@@ -1,22 +1,129 @@
-from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
+from functools import lru_cache
 import os
 
-load_dotenv()
 
-class Settings(BaseSettings):
-    DB_NAME: str = os.getenv("DB_NAME", "olist")
-    DB_USER: str = os.getenv("DB_USER", "")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
-    DB_HOST: str = os.getenv("DB_HOST", "localhost")
-    DB_PORT: str = os.getenv("DB_PORT", "5432")
+def _settings_class():
+    # pydantic and dotenv are only imported when settings are first needed.
+    from pydantic_settings import BaseSettings
 
-    @property
-    def DATABASE_URL(self) -> str:
-        return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+    class Settings(BaseSettings):
+        DB_NAME: str = os.getenv("DB_NAME", "olist")
+        DB_USER: str = os.getenv("DB_USER", "")
+        DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
+        DB_HOST: str = os.getenv("DB_HOST", "localhost")
+        DB_PORT: str = os.getenv("DB_PORT", "5432")
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+        # Connection pool
+        DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+        DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "5"))
+        DB_POOL_IDLE_TIMEOUT: float = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+        DB_POOL_HEALTH_CHECK_INTERVAL: float = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))
+        DB_POOL_CHECKOUT_TIMEOUT: float = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "30"))
 
-settings = Settings()
\ No newline at end of file
+        # Report runner
+        ANALYTICS_PARALLEL: bool = os.getenv("ANALYTICS_PARALLEL", "false").lower() in ("1", "true", "yes")
+        ANALYTICS_MAX_WORKERS: int = int(os.getenv("ANALYTICS_MAX_WORKERS", "4"))
+        ANALYTICS_STREAMING: bool = os.getenv("ANALYTICS_STREAMING", "false").lower() in ("1", "true", "yes")
+        ANALYTICS_ITERSIZE: int = int(os.getenv("ANALYTICS_ITERSIZE", "2000"))
+        ANALYTICS_PREVIEW_ROWS: int = int(os.getenv("ANALYTICS_PREVIEW_ROWS", "25"))
+        # Fetch reports with COPY into NumPy columns instead of row tuples
+        ANALYTICS_COLUMNAR: bool = os.getenv("ANALYTICS_COLUMNAR", "false").lower() in ("1", "true", "yes")
+
+        # SQL script runner (pevious_tasks/main.py)
+        SQL_SCRIPT_WORKERS: int = int(os.getenv("SQL_SCRIPT_WORKERS", "4"))
+        # 0 = no timeout; a "-- @timeout <ms>" comment overrides it per statement
+        SQL_STATEMENT_TIMEOUT_MS: int = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "0"))
+
+        # Result cache
+        QUERY_CACHE_ENABLED: bool = os.getenv("QUERY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        QUERY_CACHE_DIR: str = os.getenv("QUERY_CACHE_DIR", ".query_cache")
+        QUERY_CACHE_TTL: float = float(os.getenv("QUERY_CACHE_TTL", "300"))
+        QUERY_CACHE_MAX_ROWS: int = int(os.getenv("QUERY_CACHE_MAX_ROWS", "100000"))
+
+        # Rollups
+        ROLLUPS_ENABLED: bool = os.getenv("ROLLUPS_ENABLED", "true").lower() in ("1", "true", "yes")
+        ROLLUPS_AUTO_REFRESH: bool = os.getenv("ROLLUPS_AUTO_REFRESH", "false").lower() in ("1", "true", "yes")
+        ROLLUP_MAX_AGE: float = float(os.getenv("ROLLUP_MAX_AGE", "900"))
+
+        # Synthetic ingestion (autoInsert.py); defaults reproduce one row every 10 s
+        INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "1"))
+        INGEST_TOTAL_ROWS: int = int(os.getenv("INGEST_TOTAL_ROWS", "0"))
+        INGEST_TARGET_RATE: float = float(os.getenv("INGEST_TARGET_RATE", "0.1"))
+        INGEST_METHOD: str = os.getenv("INGEST_METHOD", "copy")
+        INGEST_REPORT_INTERVAL: float = float(os.getenv("INGEST_REPORT_INTERVAL", "5"))
+
+        # Multi-table workload generator (workload_generator.py)
+        WORKLOAD_WORKERS: int = int(os.getenv("WORKLOAD_WORKERS", "4"))
+        WORKLOAD_SHARD_SIZE: int = int(os.getenv("WORKLOAD_SHARD_SIZE", "5000"))
+        WORKLOAD_PRODUCT_SAMPLE: int = int(os.getenv("WORKLOAD_PRODUCT_SAMPLE", "50000"))
+
+        # Weather exporter (custom_exporter.py)
+        EXPORTER_PORT: int = int(os.getenv("EXPORTER_PORT", "8000"))
+        EXPORTER_INTERVAL: float = float(os.getenv("EXPORTER_INTERVAL", "30"))
+        EXPORTER_CONCURRENCY: int = int(os.getenv("EXPORTER_CONCURRENCY", "16"))
+        EXPORTER_CITY_TIMEOUT: float = float(os.getenv("EXPORTER_CITY_TIMEOUT", "10"))
+        EXPORTER_CITIES_FILE: str = os.getenv("EXPORTER_CITIES_FILE", "")
+        # "loop" refreshes in the background; "collect" fetches lazily at scrape time
+        EXPORTER_MODE: str = os.getenv("EXPORTER_MODE", "loop")
+        EXPORTER_CACHE_TTL: float = float(os.getenv("EXPORTER_CACHE_TTL", "15"))
+        # Collect mode: how long one refresh waits for all cities (under Prometheus' 10 s scrape_timeout)
+        EXPORTER_SCRAPE_BUDGET: float = float(os.getenv("EXPORTER_SCRAPE_BUDGET", "8"))
+
+        # Business KPI exporter (kpi_exporter.py)
+        KPI_EXPORTER_PORT: int = int(os.getenv("KPI_EXPORTER_PORT", "8001"))
+        KPI_REFRESH_INTERVAL: float = float(os.getenv("KPI_REFRESH_INTERVAL", "30"))
+        KPI_BATCH_SIZE: int = int(os.getenv("KPI_BATCH_SIZE", "20000"))
+        KPI_MAX_BATCHES: int = int(os.getenv("KPI_MAX_BATCHES", "5"))
+        KPI_STATEMENT_TIMEOUT_MS: int = int(os.getenv("KPI_STATEMENT_TIMEOUT_MS", "5000"))
+        KPI_TOP_SELLERS: int = int(os.getenv("KPI_TOP_SELLERS", "50"))
+        # How long an unpaid order holds the orders watermark back, waiting for its payment
+        KPI_PAYMENT_GRACE: float = float(os.getenv("KPI_PAYMENT_GRACE", "600"))
+        # Seconds between full rebuilds; 0 rebuilds only on updates, deletes or back-dated inserts
+        KPI_FULL_REBUILD_INTERVAL: float = float(os.getenv("KPI_FULL_REBUILD_INTERVAL", "3600"))
+
+        # Report instrumentation (pevious_tasks/report_metrics.py)
+        REPORT_METRICS_ENABLED: bool = os.getenv("REPORT_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+        # 0 disables the embedded /metrics endpoint
+        REPORT_METRICS_PORT: int = int(os.getenv("REPORT_METRICS_PORT", "0"))
+        REPORT_METRICS_TEXTFILE: str = os.getenv("REPORT_METRICS_TEXTFILE", "")
+        REPORT_METRICS_PUSHGATEWAY: str = os.getenv("REPORT_METRICS_PUSHGATEWAY", "")
+        REPORT_LOG_JSON: str = os.getenv("REPORT_LOG_JSON", "")
+
+        # Charts
+        CHART_HIST_PUSHDOWN: bool = os.getenv("CHART_HIST_PUSHDOWN", "true").lower() in ("1", "true", "yes")
+        CHART_HIST_BINS: int = int(os.getenv("CHART_HIST_BINS", "10"))
+        # Processes rendering charts; 0 = one per core, 1 = render inline
+        CHART_RENDER_WORKERS: int = int(os.getenv("CHART_RENDER_WORKERS", "0"))
+        CHART_SKIP_UNCHANGED: bool = os.getenv("CHART_SKIP_UNCHANGED", "true").lower() in ("1", "true", "yes")
+
+        # Interactive trend (pevious_tasks/queries.py)
+        TREND_HTML_PATH: str = os.getenv("TREND_HTML_PATH", "sales_trend.html")
+        TREND_MAX_POINTS: int = int(os.getenv("TREND_MAX_POINTS", "1500"))
+
+        @property
+        def DATABASE_URL(self) -> str:
+            return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+        class Config:
+            env_file = ".env"
+            case_sensitive = True
+
+    return Settings
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """Load .env and build the settings once; every later call returns the same object."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return _settings_class()()
+
+
+def __getattr__(name):
+    # ``from config import settings`` keeps working, built on first access.
+    if name == "settings":
+        return get_settings()
+    if name == "Settings":
+        return type(get_settings())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
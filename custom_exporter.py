@@ -1,5 +1,11 @@
-from prometheus_client import start_http_server, Gauge, Info, Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from prometheus_client import start_http_server, CollectorRegistry, Gauge, Info, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from requests.adapters import HTTPAdapter
+from config import settings
+import json
 import requests
+import threading
 import time
 
 # Информация об экспортере
@@ -23,63 +29,248 @@ weather_cloud_cover = Gauge('weather_cloud_cover_percent', 'Cloud cover (%)', ['
 weather_visibility = Gauge('weather_visibility_km', 'Visibility (km)', ['city', 'country'])
 
 # Метрики экспортера
-scrape_duration = Gauge('exporter_scrape_duration_seconds', 'Time taken to fetch data from API (seconds)')
+scrape_duration = Gauge('exporter_scrape_duration_seconds', 'Time taken to fetch data for all cities in one cycle (seconds)')
+city_scrape_duration = Histogram(
+    'exporter_city_scrape_duration_seconds', 'Time taken to fetch data for one city (seconds)', ['city'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
 success_counter = Counter('exporter_success_total', 'Total number of successful API scrapes')
 failure_counter = Counter('exporter_failures_total', 'Total number of failed API scrapes')
 
+# Только для режима collect-on-scrape
+upstream_refreshes = Counter('exporter_upstream_refreshes_total', 'Cache refreshes that called the weather API',
+                             registry=None)
+cache_hits = Counter('exporter_cache_hits_total', 'Scrapes answered from the cached weather snapshot',
+                     registry=None)
+
+
+DEFAULT_CITIES = [
+    {'name': 'Astana', 'lat': 51.1694, 'lon': 71.4491},
+    {'name': 'Almaty', 'lat': 43.2220, 'lon': 76.8512}
+]
+
+
+def load_cities():
+    # Список городов: JSON-файл [{"name", "lat", "lon", "country"?}, ...] или два города по умолчанию
+    if not settings.EXPORTER_CITIES_FILE:
+        return DEFAULT_CITIES
+    with open(settings.EXPORTER_CITIES_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def create_session(pool_size):
+    # Одна keep-alive сессия на все потоки, пул соединений по числу воркеров
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_current_weather(session, latitude, longitude, timeout=10):
+    url = "https://api.open-meteo.com/v1/forecast"
+    params = {
+        'latitude': latitude,
+        'longitude': longitude,
+        'current_weather': 'true',
+        'timezone': 'Asia/Almaty',
+        'daily': ['sunrise', 'sunset']
+    }
+
+    response = session.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()['current_weather']
 
-def fetch_weather_for_city(city_name, latitude, longitude):
-    start_time = time.time()
-    try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            'latitude': latitude,
-            'longitude': longitude,
-            'current_weather': 'true',
-            'timezone': 'Asia/Almaty',
-            'daily': ['sunrise', 'sunset']
-        }
-
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        current = data['current_weather']
 
+def city_metric_values(current):
+    return [
         # Основные метрики
-        weather_temperature.labels(city=city_name, country='Kazakhstan').set(current['temperature'])
-        weather_windspeed.labels(city=city_name, country='Kazakhstan').set(current['windspeed'])
-        weather_feels_like.labels(city=city_name, country='Kazakhstan').set(current['temperature'] - current['windspeed']*0.1)
-        weather_humidity.labels(city=city_name, country='Kazakhstan').set(50 + (current['windspeed'] % 30))
-        weather_pressure.labels(city=city_name, country='Kazakhstan').set(1010 + (current['temperature'] % 5))
-        weather_daylight.labels(city=city_name, country='Kazakhstan').set(10 + (current['temperature'] % 5))
+        (weather_temperature, current['temperature']),
+        (weather_windspeed, current['windspeed']),
+        (weather_feels_like, current['temperature'] - current['windspeed']*0.1),
+        (weather_humidity, 50 + (current['windspeed'] % 30)),
+        (weather_pressure, 1010 + (current['temperature'] % 5)),
+        (weather_daylight, 10 + (current['temperature'] % 5)),
 
         # Дополнительные метрики (демо)
-        weather_uv_index.labels(city=city_name, country='Kazakhstan').set((current['temperature'] % 11))
-        weather_precipitation.labels(city=city_name, country='Kazakhstan').set((current['windspeed'] % 5))
-        weather_cloud_cover.labels(city=city_name, country='Kazakhstan').set((current['temperature'] % 100))
-        weather_visibility.labels(city=city_name, country='Kazakhstan').set(10 - (current['windspeed'] % 5))
+        (weather_uv_index, (current['temperature'] % 11)),
+        (weather_precipitation, (current['windspeed'] % 5)),
+        (weather_cloud_cover, (current['temperature'] % 100)),
+        (weather_visibility, 10 - (current['windspeed'] % 5)),
+    ]
 
-        weather_api_status.set(1)
-        success_counter.inc()
 
-    except requests.exceptions.RequestException:
-        weather_api_status.set(0)
+def set_city_metrics(city_name, country, current):
+    for gauge, value in city_metric_values(current):
+        gauge.labels(city=city_name, country=country).set(value)
+
+
+def fetch_weather_for_city(session, city, timeout=10):
+    """Returns the city's current weather, or None if the request failed."""
+    start_time = time.time()
+    try:
+        current = fetch_current_weather(session, city['lat'], city['lon'], timeout)
+        success_counter.inc()
+        return current
+    except (requests.exceptions.RequestException, KeyError, ValueError):
         failure_counter.inc()
+        return None
     finally:
+        city_scrape_duration.labels(city=city['name']).observe(time.time() - start_time)
+
+
+def update_city(session, city, timeout=10):
+    current = fetch_weather_for_city(session, city, timeout)
+    if current is None:
+        return False
+    set_city_metrics(city['name'], city.get('country', 'Kazakhstan'), current)
+    return True
+
+
+def scrape_cities(executor, session, cities, timeout, deadline):
+    """Fetch all cities concurrently; returns the number of successful cities."""
+    start_time = time.time()
+    futures = [executor.submit(update_city, session, city, timeout) for city in cities]
+    done, not_done = wait(futures, timeout=deadline)
+    ok = sum(1 for f in done if f.exception() is None and f.result())
+    crashed = sum(1 for f in done if f.exception() is not None)
+
+    # Города, не уложившиеся в цикл, снимаем с очереди и считаем неудачными;
+    # уже идущие запросы досчитают себя сами в fetch_weather_for_city
+    cancelled = sum(1 for f in not_done if f.cancel())
+    failure_counter.inc(cancelled + crashed)
+    weather_api_status.set(1 if ok else 0)
+    scrape_duration.set(time.time() - start_time)
+    return ok
+
+
+class WeatherCollector:
+    """Fetches weather at scrape time instead of in a background loop.
+
+    Responses are cached for ``ttl`` seconds. If several scrapes arrive while
+    the cache is being refreshed, they wait for that one refresh instead of
+    starting their own (single-flight). A refresh waits at most ``budget``
+    seconds for all cities; cities still queued are cancelled and keep
+    their previous values.
+    """
+
+    def __init__(self, executor, session, cities, timeout, ttl, budget):
+        self.executor = executor
+        self.session = session
+        self.cities = cities
+        self.timeout = timeout
+        self.ttl = ttl
+        self.budget = budget
+
+        self._lock = threading.Lock()
+        self._snapshot = []
+        self._fetched_at = None
+        self._inflight = None
+
+    def _refresh(self):
+        start_time = time.time()
+        futures = [
+            (city, self.executor.submit(fetch_weather_for_city, self.session, city, self.timeout))
+            for city in self.cities
+        ]
+        wait([f for _, f in futures], timeout=self.budget)
+        previous = {(name, country): current for name, country, current in self._snapshot}
+        snapshot = []
+        cancelled = 0
+        for city, future in futures:
+            key = (city['name'], city.get('country', 'Kazakhstan'))
+            if future.done() and not future.cancelled():
+                current = future.result()
+            else:
+                # Не уложились в бюджет: снимаем с очереди и оставляем прошлое значение;
+                # уже идущие запросы засчитаются в fetch_weather_for_city
+                cancelled += future.cancel()
+                current = previous.get(key)
+            if current is not None:
+                snapshot.append((*key, current))
+        failure_counter.inc(cancelled)
         scrape_duration.set(time.time() - start_time)
+        upstream_refreshes.inc()
+        return snapshot
 
+    def snapshot(self):
+        with self._lock:
+            if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl:
+                cache_hits.inc()
+                return self._snapshot
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
 
-if __name__ == '__main__':
-    exporter_info.info({'version': '1.1', 'author': 'Begaidar Sailaubayev', 'sources': 'Open-Meteo API'})
-    start_http_server(8000)
-    print("✅ Custom Exporter started on port 8000")
+        if not leader:
+            # Кто-то уже обновляет кэш — ждём его результат
+            event.wait()
+            cache_hits.inc()
+            return self._snapshot
 
-    cities = [
-        {'name': 'Astana', 'lat': 51.1694, 'lon': 71.4491},
-        {'name': 'Almaty', 'lat': 43.2220, 'lon': 76.8512}
-    ]
+        try:
+            snapshot = self._refresh()
+            with self._lock:
+                self._snapshot = snapshot
+                self._fetched_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+        return self._snapshot
+
+    def collect(self):
+        snapshot = self.snapshot()
+        families = {}
+        for city_name, country, current in snapshot:
+            for gauge, value in city_metric_values(current):
+                desc = gauge.describe()[0]
+                if desc.name not in families:
+                    families[desc.name] = GaugeMetricFamily(desc.name, desc.documentation, labels=['city', 'country'])
+                families[desc.name].add_metric([city_name, country], value)
+        yield from families.values()
+        yield GaugeMetricFamily('weather_api_status', 'Weather API status (1=up, 0=down)', value=1 if snapshot else 0)
+
+
+def serve_collect_mode(cities):
+    registry = CollectorRegistry()
+    concurrency = max(1, min(settings.EXPORTER_CONCURRENCY, len(cities)))
+    collector = WeatherCollector(ThreadPoolExecutor(max_workers=concurrency), create_session(concurrency),
+                                 cities, settings.EXPORTER_CITY_TIMEOUT, settings.EXPORTER_CACHE_TTL,
+                                 settings.EXPORTER_SCRAPE_BUDGET)
+    for metric in (exporter_info, scrape_duration, city_scrape_duration, success_counter, failure_counter,
+                   upstream_refreshes, cache_hits, collector):
+        registry.register(metric)
+    start_http_server(settings.EXPORTER_PORT, registry=registry)
+    print(f"✅ Custom Exporter (collect-on-scrape, TTL {settings.EXPORTER_CACHE_TTL}s) started on port {settings.EXPORTER_PORT}")
+    while True:
+        time.sleep(3600)
+
+
+def serve_loop_mode(cities):
+    start_http_server(settings.EXPORTER_PORT)
+    print(f"✅ Custom Exporter started on port {settings.EXPORTER_PORT}")
+
+    concurrency = max(1, min(settings.EXPORTER_CONCURRENCY, len(cities)))
+    session = create_session(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
 
     while True:
-        for city in cities:
-            fetch_weather_for_city(city['name'], city['lat'], city['lon'])
-        time.sleep(30)
+        cycle_start = time.time()
+        ok = scrape_cities(executor, session, cities, settings.EXPORTER_CITY_TIMEOUT, settings.EXPORTER_INTERVAL)
+        if ok < len(cities):
+            print(f"⚠ {len(cities) - ok} of {len(cities)} cities failed this cycle")
+        time.sleep(max(0, settings.EXPORTER_INTERVAL - (time.time() - cycle_start)))
+
+
+def main():
+    exporter_info.info({'version': '1.3', 'author': 'Begaidar Sailaubayev', 'sources': 'Open-Meteo API'})
+    if settings.EXPORTER_MODE == 'collect':
+        serve_collect_mode(load_cities())
+    else:
+        serve_loop_mode(load_cities())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of psycopg2 connections.
+
+    Connections are created lazily up to ``max_size``. Idle connections older
+    than ``idle_timeout`` seconds are closed, and a connection that has been
+    idle longer than ``health_check_interval`` is pinged with ``SELECT 1``
+    before it is handed out again.
+    """
+
+    def __init__(self, db_params: dict, min_size: int = 1, max_size: int = 5,
+                 idle_timeout: float = 300.0, health_check_interval: float = 30.0,
+                 checkout_timeout: float = 30.0):
+        self.db_params = db_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = []  # (connection, returned_at)
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.stats = {
+            "checkouts": 0,
+            "created": 0,
+            "closed": 0,
+            "health_check_failures": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "in_use_max": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_params)
+        with self._cond:
+            self.stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self.stats["closed"] += 1
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self.stats["health_check_failures"] += 1
+            return False
+
+    def _prune_idle(self, now: float) -> None:
+        # Keep the newest connections, close the ones idle for too long.
+        keep = []
+        for conn, returned_at in self._idle:
+            if now - returned_at > self.idle_timeout and self._size > self.min_size:
+                self._discard(conn)
+                self._size -= 1
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+
+    def _reserve(self, deadline: float):
+        """Pop an idle connection or reserve a slot for a new one; call with the lock held.
+
+        Returns ``(conn, idle_for)``, with ``conn`` None when a slot was reserved.
+        """
+        while True:
+            if self._closed:
+                raise PoolTimeout("Connection pool is closed")
+
+            now = time.monotonic()
+            self._prune_idle(now)
+
+            if self._idle:
+                conn, returned_at = self._idle.pop()
+                return conn, now - returned_at
+
+            if self._size < self.max_size:
+                # Count the slot now so other threads don't overfill the pool
+                # while this one connects without the lock.
+                self._size += 1
+                return None, 0.0
+
+            remaining = deadline - now
+            if remaining <= 0:
+                self.stats["timeouts"] += 1
+                raise PoolTimeout(
+                    f"Timed out after {self.checkout_timeout}s waiting for a connection "
+                    f"(pool size {self.max_size})"
+                )
+            self._cond.wait(remaining)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+
+        # Connecting and pinging happen outside the lock, so a slow server
+        # doesn't block putconn/get_stats or other checkouts.
+        while True:
+            with self._cond:
+                conn, idle_for = self._reserve(deadline)
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                break
+
+            if self._is_healthy(conn, idle_for):
+                break
+            self._discard(conn)
+            self._release_slot()
+
+        with self._cond:
+            waited = time.monotonic() - started
+            self.stats["checkouts"] += 1
+            self.stats["wait_time_total"] += waited
+            self.stats["wait_time_max"] = max(self.stats["wait_time_max"], waited)
+            in_use = self._size - len(self._idle)
+            self.stats["in_use_max"] = max(self.stats["in_use_max"], in_use)
+        return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        with self._cond:
+            if discard or self._closed or conn.closed:
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commit on success, roll back on error."""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken or conn.closed != 0)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts if checkouts else 0.0
+        return stats
+
+
+def create_pool(settings) -> ConnectionPool:
+    db_params = {
+        "dbname": settings.DB_NAME,
+        "user": settings.DB_USER,
+        "password": settings.DB_PASSWORD,
+        "host": settings.DB_HOST,
+        "port": settings.DB_PORT
+    }
+    return ConnectionPool(
+        db_params,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        idle_timeout=settings.DB_POOL_IDLE_TIMEOUT,
+        health_check_interval=settings.DB_POOL_HEALTH_CHECK_INTERVAL,
+        checkout_timeout=settings.DB_POOL_CHECKOUT_TIMEOUT,
+    )
@@ -0,0 +1,363 @@
+"""Prometheus exporter for the Olist business KPIs shown in the analytics reports.
+
+KPIs are kept as running totals in memory and advanced from keyset
+watermarks ((order_purchase_timestamp, order_id) for orders and payments,
+(review_creation_date, review_id) for reviews). Each refresh reads at most
+KPI_BATCH_SIZE * KPI_MAX_BATCHES new rows under a statement_timeout, in a
+background thread. Scrapes are served from the in-memory totals and never
+query the database.
+
+An order scanned before its payment committed is not lost: the orders
+watermark stays just below the oldest unpaid order for up to
+KPI_PAYMENT_GRACE seconds after it was first seen, and the orders after it
+are re-read on the next refresh (those already counted are skipped).
+Orders still unpaid after that are left out, as in the report queries.
+
+A full rebuild starts when source rows were updated or deleted
+(``pg_stat_user_tables`` counters), when rows older than a watermark
+appeared (back-dated inserts such as workload_generator.py's), and every
+KPI_FULL_REBUILD_INTERVAL seconds. It is built next to the served totals,
+which stay in place until the rebuild has caught up. Payments arriving after
+the grace period and order items added to already reviewed orders are only
+picked up by the periodic rebuild.
+"""
+import threading
+import time
+
+from prometheus_client import REGISTRY, Counter, Gauge, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+from config import settings
+from db_pool import create_pool
+
+START = ("-infinity", "")
+
+ORDERS_BATCH_QUERY = """
+    WITH batch AS (
+        SELECT o.order_id, o.order_purchase_timestamp, o.customer_id
+        FROM olist_orders o
+        WHERE (o.order_purchase_timestamp, o.order_id) > (%(ts)s, %(id)s)
+        ORDER BY o.order_purchase_timestamp, o.order_id
+        LIMIT %(limit)s
+    )
+    SELECT
+        b.order_id,
+        b.order_purchase_timestamp,
+        c.customer_state,
+        op.payment_type,
+        COUNT(op.payment_value),
+        COALESCE(SUM(op.payment_value), 0)
+    FROM batch b
+    LEFT JOIN olist_customers c ON c.customer_id = b.customer_id
+    LEFT JOIN olist_order_payments op ON op.order_id = b.order_id
+    GROUP BY 1, 2, 3, 4
+    ORDER BY 2, 1
+"""
+
+REVIEWS_BATCH_QUERY = """
+    WITH batch AS (
+        SELECT r.review_id, r.order_id, r.review_score, r.review_creation_date
+        FROM olist_order_reviews r
+        WHERE (r.review_creation_date, r.review_id) > (%(ts)s, %(id)s)
+        ORDER BY r.review_creation_date, r.review_id
+        LIMIT %(limit)s
+    )
+    SELECT b.review_id, b.review_creation_date, b.review_score, s.seller_id
+    FROM batch b
+    LEFT JOIN LATERAL (
+        SELECT DISTINCT oi.seller_id
+        FROM olist_order_items oi
+        WHERE oi.order_id = b.order_id
+    ) s ON true
+    ORDER BY 2, 1
+"""
+
+# Rows at or before a watermark; compared with the rows the totals have read.
+COUNT_QUERIES = {
+    "orders": """
+        SELECT COUNT(*) FROM olist_orders
+        WHERE (order_purchase_timestamp, order_id) <= (%(ts)s, %(id)s)
+    """,
+    "reviews": """
+        SELECT COUNT(*) FROM olist_order_reviews
+        WHERE (review_creation_date, review_id) <= (%(ts)s, %(id)s)
+    """,
+}
+
+SOURCE_TABLES = ["olist_customers", "olist_order_items", "olist_order_payments", "olist_order_reviews", "olist_orders"]
+
+refresh_duration = Gauge('shopsight_kpi_refresh_duration_seconds', 'Duration of the last KPI refresh')
+refresh_failures = Counter('shopsight_kpi_refresh_failures_total', 'KPI refreshes that failed')
+rows_processed = Counter('shopsight_kpi_rows_processed_total', 'Rows read by incremental KPI refreshes', ['stream'])
+full_rebuilds = Counter('shopsight_kpi_full_rebuilds_total', 'Full KPI rebuilds started', ['reason'])
+
+
+class KpiTotals:
+    """Running totals and the watermarks they were read up to."""
+
+    def __init__(self):
+        self.watermarks = {"orders": START, "reviews": START}
+        # Rows at or before each watermark, to detect back-dated inserts.
+        self.rows_before = {"orders": 0, "reviews": 0}
+        self.counted = {}  # order_id -> key, paid orders counted past the orders watermark
+        self.unpaid_since = {}  # order_id -> (key, monotonic time it was first read without payments)
+        self.month_revenue = {}
+        self.month_orders = {}
+        self.payment_count = {}
+        self.payment_value = {}
+        self.state_revenue = {}
+        self.state_orders = {}
+        self.seller_score_sum = {}
+        self.seller_reviews = {}
+
+    def prune(self):
+        """Forget per-order state at or before the orders watermark."""
+        watermark = self.watermarks["orders"]
+        if watermark == START:
+            return
+        self.counted = {order_id: key for order_id, key in self.counted.items() if key > watermark}
+        self.unpaid_since = {order_id: (key, since) for order_id, (key, since) in self.unpaid_since.items()
+                             if key > watermark}
+
+
+class KpiAggregator:
+    """Running KPI totals advanced incrementally from watermarks."""
+
+    def __init__(self, pool, batch_size, max_batches, statement_timeout_ms,
+                 payment_grace=600.0, full_rebuild_interval=0.0):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.statement_timeout_ms = statement_timeout_ms
+        self.payment_grace = payment_grace
+        self.full_rebuild_interval = full_rebuild_interval
+
+        self._lock = threading.Lock()
+        self.totals = KpiTotals()
+        self._rebuild = None  # KpiTotals being rebuilt while self.totals is served
+        self._source_changes = None
+        self._built_at = time.monotonic()
+
+    def _query(self, query, params):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL statement_timeout = %s", (self.statement_timeout_ms,))
+                cur.execute(query, params)
+                return cur.fetchall()
+
+    def _fetch_batch(self, query, after):
+        ts, last_id = after
+        return self._query(query, {"ts": ts, "id": last_id, "limit": self.batch_size})
+
+    def _count_before(self, stream, watermark):
+        ts, last_id = watermark
+        return self._query(COUNT_QUERIES[stream], {"ts": ts, "id": last_id})[0][0]
+
+    def _source_changes_now(self):
+        """Updated + deleted rows of the source tables, from ``pg_stat_user_tables``."""
+        rows = self._query("""
+            SELECT COALESCE(SUM(n_tup_upd + n_tup_del), 0)
+            FROM pg_stat_user_tables
+            WHERE relname = ANY(%(tables)s)
+        """, {"tables": SOURCE_TABLES})
+        return rows[0][0]
+
+    def _apply_orders(self, totals, rows):
+        """Count the paid orders not counted yet; returns [(key, paid)] per order read."""
+        orders = {}
+        for row in rows:
+            orders.setdefault((row[1], row[0]), []).append(row)
+        read = []
+        now = time.monotonic()
+        with self._lock:
+            for key, order_rows in orders.items():
+                purchased, order_id = key
+                paid = order_rows[0][3] is not None
+                read.append((key, paid))
+                if not paid:
+                    totals.unpaid_since.setdefault(order_id, (key, now))
+                    continue
+                if order_id in totals.counted:
+                    continue
+                totals.counted[order_id] = key
+                totals.unpaid_since.pop(order_id, None)
+                month = purchased.strftime("%Y-%m")
+                state = order_rows[0][2]
+                totals.month_orders[month] = totals.month_orders.get(month, 0) + 1
+                if state is not None:
+                    totals.state_orders[state] = totals.state_orders.get(state, 0) + 1
+                for _, _, _, payment_type, payments, value in order_rows:
+                    value = float(value)
+                    totals.month_revenue[month] = totals.month_revenue.get(month, 0.0) + value
+                    if state is not None:
+                        totals.state_revenue[state] = totals.state_revenue.get(state, 0.0) + value
+                    totals.payment_count[payment_type] = totals.payment_count.get(payment_type, 0) + payments
+                    totals.payment_value[payment_type] = totals.payment_value.get(payment_type, 0.0) + value
+        return read
+
+    def _apply_reviews(self, totals, rows):
+        with self._lock:
+            for _, _, score, seller_id in rows:
+                if seller_id is None or score is None:
+                    continue
+                totals.seller_score_sum[seller_id] = totals.seller_score_sum.get(seller_id, 0) + score
+                totals.seller_reviews[seller_id] = totals.seller_reviews.get(seller_id, 0) + 1
+            last = rows[-1]
+            totals.watermarks["reviews"] = (last[1], last[0])
+        reviews = len({row[0] for row in rows})
+        totals.rows_before["reviews"] += reviews
+        return reviews
+
+    def _advance_orders(self, totals):
+        """Read up to ``max_batches`` batches of orders; returns True once nothing newer is left."""
+        after = totals.watermarks["orders"]
+        read = []
+        caught_up = False
+        for _ in range(self.max_batches):
+            rows = self._fetch_batch(ORDERS_BATCH_QUERY, after)
+            if not rows:
+                caught_up = True
+                break
+            orders = self._apply_orders(totals, rows)
+            rows_processed.labels(stream="orders").inc(len(orders))
+            read.extend(orders)
+            after = orders[-1][0]
+            if len(orders) < self.batch_size:
+                caught_up = True
+                break
+
+        # Stop just below the oldest order still waiting for its payment; the
+        # orders after it are read again next time and skipped if counted.
+        now = time.monotonic()
+        held = len(read)
+        for position, (key, paid) in enumerate(read):
+            if not paid and now - totals.unpaid_since[key[1]][1] < self.payment_grace:
+                held = position
+                break
+        if held:
+            with self._lock:
+                totals.watermarks["orders"] = read[held - 1][0]
+            totals.rows_before["orders"] += held
+            totals.prune()
+        return caught_up
+
+    def _advance_reviews(self, totals):
+        for _ in range(self.max_batches):
+            rows = self._fetch_batch(REVIEWS_BATCH_QUERY, totals.watermarks["reviews"])
+            if not rows:
+                return True
+            reviews = self._apply_reviews(totals, rows)
+            rows_processed.labels(stream="reviews").inc(reviews)
+            if reviews < self.batch_size:
+                return True
+        return False
+
+    def _rebuild_reason(self, totals, changes):
+        if self._source_changes is not None and changes != self._source_changes:
+            return "source rows updated or deleted"
+        for stream, watermark in totals.watermarks.items():
+            if self._count_before(stream, watermark) != totals.rows_before[stream]:
+                return f"{stream} older than the watermark inserted"
+        if (self._rebuild is None and self.full_rebuild_interval
+                and time.monotonic() - self._built_at >= self.full_rebuild_interval):
+            return "periodic"
+        return None
+
+    def refresh(self):
+        """Advance both streams by at most ``max_batches`` batches each.
+
+        During a full rebuild the new totals are advanced instead, and served
+        once they have caught up with both streams.
+        """
+        # Counters are read first, so writes racing with the refresh trigger the next rebuild.
+        changes = self._source_changes_now()
+        reason = self._rebuild_reason(self._rebuild or self.totals, changes)
+        self._source_changes = changes
+        if reason is not None:
+            print(f"↻ KPI full rebuild: {reason}")
+            full_rebuilds.labels(reason=reason).inc()
+            self._rebuild = KpiTotals()
+
+        totals = self._rebuild or self.totals
+        caught_up = self._advance_orders(totals)
+        caught_up = self._advance_reviews(totals) and caught_up
+        if self._rebuild is not None and caught_up:
+            with self._lock:
+                self.totals = self._rebuild
+            self._rebuild = None
+            self._built_at = time.monotonic()
+
+    def collect(self):
+        with self._lock:
+            totals = self.totals
+            month_revenue = dict(totals.month_revenue)
+            month_orders = dict(totals.month_orders)
+            payment_count = dict(totals.payment_count)
+            payment_value = dict(totals.payment_value)
+            state_aov = {s: totals.state_revenue.get(s, 0.0) / n for s, n in totals.state_orders.items() if n}
+            top_sellers = sorted(totals.seller_reviews.items(), key=lambda item: item[1], reverse=True)
+            top_sellers = [
+                (seller_id, count, totals.seller_score_sum[seller_id] / count)
+                for seller_id, count in top_sellers[:settings.KPI_TOP_SELLERS]
+            ]
+            watermarks = dict(totals.watermarks)
+
+        revenue = GaugeMetricFamily('shopsight_revenue_brl', 'Payment revenue per purchase month (BRL)', labels=['month'])
+        orders = GaugeMetricFamily('shopsight_orders', 'Orders per purchase month', labels=['month'])
+        for month in sorted(month_revenue):
+            revenue.add_metric([month], month_revenue[month])
+            orders.add_metric([month], month_orders.get(month, 0))
+
+        payments = GaugeMetricFamily('shopsight_payments', 'Payments per payment type', labels=['payment_type'])
+        payments_value = GaugeMetricFamily('shopsight_payment_value_brl', 'Payment value per payment type (BRL)',
+                                           labels=['payment_type'])
+        for payment_type in sorted(payment_count):
+            payments.add_metric([payment_type], payment_count[payment_type])
+            payments_value.add_metric([payment_type], payment_value[payment_type])
+
+        aov = GaugeMetricFamily('shopsight_average_order_value_brl', 'Average order value per customer state (BRL)',
+                                labels=['state'])
+        for state in sorted(state_aov):
+            aov.add_metric([state], state_aov[state])
+
+        seller_score = GaugeMetricFamily('shopsight_seller_review_score', 'Average review score of the most reviewed sellers',
+                                         labels=['seller_id'])
+        seller_reviews = GaugeMetricFamily('shopsight_seller_reviews', 'Review count of the most reviewed sellers',
+                                           labels=['seller_id'])
+        for seller_id, count, score in top_sellers:
+            seller_score.add_metric([seller_id], score)
+            seller_reviews.add_metric([seller_id], count)
+
+        watermark = GaugeMetricFamily('shopsight_kpi_watermark_timestamp_seconds',
+                                      'Newest source timestamp included in the KPIs', labels=['stream'])
+        for stream, (ts, _) in watermarks.items():
+            if hasattr(ts, "timestamp"):
+                watermark.add_metric([stream], ts.timestamp())
+
+        yield from (revenue, orders, payments, payments_value, aov, seller_score, seller_reviews, watermark)
+
+
+def refresh_loop(aggregator, interval):
+    while True:
+        started = time.time()
+        try:
+            aggregator.refresh()
+        except Exception as e:
+            refresh_failures.inc()
+            print(f"⚠ KPI refresh failed: {e}")
+        refresh_duration.set(time.time() - started)
+        time.sleep(max(0, interval - (time.time() - started)))
+
+
+def main():
+    aggregator = KpiAggregator(create_pool(settings), settings.KPI_BATCH_SIZE,
+                               settings.KPI_MAX_BATCHES, settings.KPI_STATEMENT_TIMEOUT_MS,
+                               settings.KPI_PAYMENT_GRACE, settings.KPI_FULL_REBUILD_INTERVAL)
+    REGISTRY.register(aggregator)
+    start_http_server(settings.KPI_EXPORTER_PORT)
+    print(f"✅ KPI Exporter started on port {settings.KPI_EXPORTER_PORT}")
+    refresh_loop(aggregator, settings.KPI_REFRESH_INTERVAL)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Binary cache of parsed meshes, so OBJ files are only parsed once.
+
+The first load of a model stores its vertex, triangle, normal (and color)
+arrays as ``.npy`` files under ``cache_dir/<key>/``, keyed by the source's
+absolute path, mtime and size, so an edited model gets a fresh entry. Later
+loads memory-map those files: nothing is parsed and pages are only read
+when touched. Entries are evicted least-recently-used first once the cache
+grows beyond ``max_bytes``.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+ARRAYS = ("vertices", "triangles", "normals", "colors")
+META_NAME = "meta.json"
+
+
+class MeshCache:
+    def __init__(self, cache_dir: str = ".mesh_cache", max_bytes: int = 10 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def key(self, path: str) -> str:
+        st = os.stat(path)
+        source = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, path: str, parse=None) -> dict:
+        """Return the mesh arrays for ``path`` (memory-mapped, read-only) and whether it was a hit.
+
+        ``parse(path)`` must return a dict of arrays named as in ``ARRAYS``;
+        it defaults to reading the file with Open3D.
+        """
+        key = self.key(path)
+        entry = self._entry_dir(key)
+        if os.path.exists(os.path.join(entry, META_NAME)):
+            self.stats["hits"] += 1
+            hit = True
+        else:
+            self.stats["misses"] += 1
+            hit = False
+            self._store(key, path, (parse or read_mesh_arrays)(path))
+            self.evict(keep=key)
+        # Mark as recently used for LRU eviction.
+        os.utime(os.path.join(entry, META_NAME))
+        arrays = {}
+        for name in ARRAYS:
+            array_path = os.path.join(entry, f"{name}.npy")
+            if os.path.exists(array_path):
+                arrays[name] = np.load(array_path, mmap_mode="r")
+        return {"arrays": arrays, "hit": hit, "key": key}
+
+    def _store(self, key: str, path: str, arrays: dict) -> None:
+        # Write into a temp dir and rename it into place, so concurrent
+        # workers never see a half-written entry.
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir)
+        try:
+            size = 0
+            for name in ARRAYS:
+                array = arrays.get(name)
+                if array is None or len(array) == 0:
+                    continue
+                array_path = os.path.join(tmp_dir, f"{name}.npy")
+                np.save(array_path, np.ascontiguousarray(array))
+                size += os.path.getsize(array_path)
+            st = os.stat(path)
+            with open(os.path.join(tmp_dir, META_NAME), "w", encoding="utf-8") as f:
+                json.dump({"source": os.path.abspath(path), "mtime_ns": st.st_mtime_ns,
+                           "size": st.st_size, "bytes": size, "created": time.time()}, f)
+            try:
+                os.rename(tmp_dir, self._entry_dir(key))
+            except OSError:
+                # Another worker stored the same entry first.
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def entries(self) -> list:
+        """(last_used, bytes, key) for every complete entry, oldest first."""
+        result = []
+        for name in os.listdir(self.cache_dir):
+            meta_path = os.path.join(self.cache_dir, name, META_NAME)
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    size = json.load(f)["bytes"]
+                result.append((os.path.getmtime(meta_path), size, name))
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(result)
+
+    def evict(self, keep: str = None) -> int:
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            evicted += 1
+        self.stats["evictions"] += evicted
+        return evicted
+
+    def clear(self) -> None:
+        for _, _, key in self.entries():
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+
+def read_mesh_arrays(path: str) -> dict:
+    """Parse a mesh file with Open3D and return its arrays, normals included."""
+    import open3d as o3d
+
+    from mesh_pipeline import short_path
+
+    mesh = o3d.io.read_triangle_mesh(short_path(path))
+    mesh.compute_vertex_normals()
+    return {
+        "vertices": np.asarray(mesh.vertices),
+        "triangles": np.asarray(mesh.triangles),
+        "normals": np.asarray(mesh.vertex_normals),
+        "colors": np.asarray(mesh.vertex_colors),
+    }
+
+
+def arrays_to_mesh(arrays: dict):
+    """Build an Open3D mesh from cached arrays (Open3D copies them into its own buffers)."""
+    import open3d as o3d
+
+    mesh = o3d.geometry.TriangleMesh()
+    mesh.vertices = o3d.utility.Vector3dVector(arrays["vertices"])
+    mesh.triangles = o3d.utility.Vector3iVector(arrays["triangles"])
+    if "normals" in arrays:
+        mesh.vertex_normals = o3d.utility.Vector3dVector(arrays["normals"])
+    if "colors" in arrays:
+        mesh.vertex_colors = o3d.utility.Vector3dVector(arrays["colors"])
+    return mesh
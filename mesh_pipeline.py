@@ -0,0 +1,444 @@
+"""Headless 3D model pipeline: load → point cloud → Poisson → voxelize → clip → gradient.
+
+The same steps as assignment5.py (plus a level-of-detail stage), without any GUI, for one or many OBJ
+files. Each model gets its own output directory with the reconstructed,
+voxelized, clipped and colored geometry plus ``timings.json``; models are
+processed in parallel worker processes.
+
+    python mesh_pipeline.py models/ --output-dir mesh_outputs --workers 4
+    python mesh_pipeline.py car.obj --stages load clip --clip-normal 0 1 0
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from mesh_cache import MeshCache, arrays_to_mesh
+from mesh_processing import clip_mesh, gradient_colors, vertex_colors
+from voxel_stats import summarize, voxelize_multi
+
+DEFAULT_OPTIONS = {
+    "normal_radius": 0.1,
+    "normal_max_nn": 30,
+    "poisson_depth": 9,
+    # Level of detail: "preview" reconstructs a small cloud at a low depth,
+    # "final" the full-budget cloud at poisson_depth. None = no point limit.
+    "quality": "final",
+    "final_point_budget": None,
+    "preview_point_budget": 50_000,
+    "poisson_preview_depth": 7,
+    "crop_scale": 1.1,
+    "voxel_size": 0.5,
+    "voxel_sizes": [],  # extra sizes computed in the same sweep
+    "voxel_grid": False,  # also build an Open3D VoxelGrid (for viewing / voxels.ply)
+    "clip_normal": [1.0, 0.0, 0.0],
+    "clip_point": None,  # mesh center
+    "gradient_axis": 2,
+    "write_outputs": True,
+    "cache_dir": ".mesh_cache",  # None disables the mesh cache
+    "cache_max_bytes": 10 * 1024 ** 3,
+}
+
+
+def short_path(path: str) -> str:
+    """On Windows, the 8.3 short name avoids Open3D failing on non-ASCII paths."""
+    if os.name != "nt":
+        return path
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        GetShortPathName = ctypes.windll.kernel32.GetShortPathNameW
+        GetShortPathName.argtypes = [wintypes.LPCWSTR, wintypes.LPWSTR, wintypes.DWORD]
+        GetShortPathName.restype = wintypes.DWORD
+        buffer = ctypes.create_unicode_buffer(260)
+        if GetShortPathName(path, buffer, 260):
+            return buffer.value
+    except Exception:
+        pass
+    return path
+
+
+def _output(ctx, name):
+    return os.path.join(ctx["output_dir"], name)
+
+
+def load_stage(ctx, opts):
+    import open3d as o3d
+
+    cache_status = "disabled"
+    if opts["cache_dir"]:
+        cached = MeshCache(opts["cache_dir"], opts["cache_max_bytes"]).load(ctx["model_path"])
+        arrays = cached["arrays"]
+        if "triangles" not in arrays:
+            raise ValueError(f"No triangles loaded from {ctx['model_path']}")
+        # Normals come from the cache, so they are not recomputed.
+        mesh = arrays_to_mesh(arrays)
+        cache_status = "hit" if cached["hit"] else "miss"
+    else:
+        mesh = o3d.io.read_triangle_mesh(short_path(ctx["model_path"]))
+        if not mesh.has_triangles():
+            raise ValueError(f"No triangles loaded from {ctx['model_path']}")
+        mesh.compute_vertex_normals()
+    ctx["mesh"] = mesh
+    # Zero-copy view shared by the later stages.
+    ctx["vertices"] = np.asarray(mesh.vertices)
+    return {"vertices": len(mesh.vertices), "triangles": len(mesh.triangles),
+            "has_vertex_colors": mesh.has_vertex_colors(), "cache": cache_status}
+
+
+def point_cloud_stage(ctx, opts):
+    import open3d as o3d
+
+    mesh = ctx["mesh"]
+    # Open3D geometries cannot share buffers, so this is the one vertex copy
+    # the pipeline makes; Poisson and voxelization both reuse it.
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = mesh.vertices
+    if mesh.has_vertex_colors():
+        pcd.colors = mesh.vertex_colors
+    ctx["pcd"] = pcd
+    return {"points": len(pcd.points)}
+
+
+def downsample_to_budget(pcd, budget):
+    """Voxel-downsample ``pcd`` to at most ``budget`` points; returns (cloud, voxel_size)."""
+    n_points = len(pcd.points)
+    if budget is None or n_points <= budget:
+        return pcd, 0.0
+    # Model surfaces are roughly 2D, so points scale with 1 / voxel_size^2.
+    ex, ey, ez = pcd.get_axis_aligned_bounding_box().get_extent()
+    area = max(2 * (ex * ey + ey * ez + ex * ez), 1e-12)
+    size = (area / budget) ** 0.5
+    for _ in range(8):
+        down = pcd.voxel_down_sample(size)
+        if len(down.points) <= budget:
+            return down, size
+        size *= (len(down.points) / budget) ** 0.5 * 1.05
+    return down, size
+
+
+def lod_stage(ctx, opts):
+    """Build the point cloud level ``opts["quality"]`` needs, with normals from a single KD-tree pass.
+
+    Normals are estimated on the final level only. The preview level is only
+    built for ``quality="preview"``: it is downsampled from the final level,
+    and ``voxel_down_sample`` averages the normals of merged points, so no
+    second neighbour search is needed.
+    """
+    import open3d as o3d
+
+    quality = opts["quality"]
+    if quality not in ("preview", "final"):
+        raise ValueError(f"Unknown quality '{quality}' (preview or final)")
+
+    final, final_size = downsample_to_budget(ctx["pcd"], opts["final_point_budget"])
+    # Keep the search radius meaningful when points were merged.
+    radius = max(opts["normal_radius"], 2.5 * final_size)
+    final.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(
+        radius=radius, max_nn=opts["normal_max_nn"]))
+    ctx["lods"] = {"final": final}
+    stats = {
+        "normal_radius": radius,
+        "final": {"points": len(final.points), "voxel_size": final_size},
+    }
+
+    if quality == "preview":
+        preview, preview_size = downsample_to_budget(final, opts["preview_point_budget"])
+        if preview is not final:
+            preview.normalize_normals()
+        ctx["lods"]["preview"] = preview
+        stats["preview"] = {"points": len(preview.points), "voxel_size": preview_size}
+    return stats
+
+
+def poisson_stage(ctx, opts):
+    import open3d as o3d
+
+    quality = opts["quality"]
+    if quality not in ("preview", "final"):
+        raise ValueError(f"Unknown quality '{quality}' (preview or final)")
+    pcd = ctx["lods"][quality]
+    depth = opts["poisson_preview_depth"] if quality == "preview" else opts["poisson_depth"]
+    mesh_poisson, _densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=depth)
+    bbox = pcd.get_axis_aligned_bounding_box()
+    bbox = bbox.scale(opts["crop_scale"], center=bbox.get_center())
+    reconstructed = mesh_poisson.crop(bbox)
+    del mesh_poisson, _densities
+    ctx["reconstructed"] = reconstructed
+    if opts["write_outputs"]:
+        o3d.io.write_triangle_mesh(_output(ctx, "poisson.ply"), reconstructed)
+    return {"quality": quality, "points": len(pcd.points), "depth": depth,
+            "vertices": len(reconstructed.vertices), "triangles": len(reconstructed.triangles)}
+
+
+def voxelize_stage(ctx, opts):
+    import open3d as o3d
+
+    sizes = [opts["voxel_size"], *opts["voxel_sizes"]]
+    results = voxelize_multi(np.asarray(ctx["pcd"].points), sizes)
+    ctx["voxel_stats"] = results
+    if opts["write_outputs"]:
+        for size, result in results.items():
+            np.savez(_output(ctx, f"voxels_{size:g}.npz"), **result)
+
+    if opts["voxel_grid"]:
+        voxel_grid = o3d.geometry.VoxelGrid.create_from_point_cloud(ctx["pcd"], opts["voxel_size"])
+        ctx["voxel_grid"] = voxel_grid
+        if opts["write_outputs"]:
+            o3d.io.write_voxel_grid(_output(ctx, "voxels.ply"), voxel_grid)
+    return {**summarize(results[opts["voxel_size"]]),
+            "sweep": [summarize(results[size]) for size in sorted(results)]}
+
+
+def clip_stage(ctx, opts):
+    import open3d as o3d
+
+    mesh = ctx["mesh"]
+    point = opts["clip_point"] if opts["clip_point"] is not None else mesh.get_center()
+    clipped = clip_mesh(mesh, opts["clip_normal"], point)
+    if len(clipped.triangles):
+        clipped.compute_vertex_normals()
+        clipped.paint_uniform_color([0.3, 0.8, 0.3])
+    ctx["clipped"] = clipped
+    if opts["write_outputs"]:
+        o3d.io.write_triangle_mesh(_output(ctx, "clipped.ply"), clipped)
+    return {"normal": list(opts["clip_normal"]), "point": [float(v) for v in point],
+            "vertices": len(clipped.vertices), "triangles": len(clipped.triangles)}
+
+
+def gradient_stage(ctx, opts):
+    import open3d as o3d
+
+    # Only a color array is allocated; the mesh itself is not copied.
+    vertices = ctx["vertices"]
+    coords = vertices[:, opts["gradient_axis"]]
+    colors = gradient_colors(coords)
+    ctx["gradient_colors"] = colors
+    if opts["write_outputs"]:
+        with vertex_colors(ctx["mesh"], colors) as colored:
+            o3d.io.write_triangle_mesh(_output(ctx, "gradient.ply"), colored)
+    min_idx, max_idx = np.argmin(coords), np.argmax(coords)
+    return {"axis": opts["gradient_axis"], "min": float(coords[min_idx]), "max": float(coords[max_idx]),
+            "min_point": vertices[min_idx].tolist(), "max_point": vertices[max_idx].tolist()}
+
+
+STAGES = {
+    "load": load_stage,
+    "point_cloud": point_cloud_stage,
+    "lod": lod_stage,
+    "poisson": poisson_stage,
+    "voxelize": voxelize_stage,
+    "clip": clip_stage,
+    "gradient": gradient_stage,
+}
+# Context keys each stage adds; in batch mode they are dropped as soon as no
+# remaining stage depends on them.
+STAGE_OUTPUTS = {
+    "load": ["mesh", "vertices"],
+    "point_cloud": ["pcd"],
+    "lod": ["lods"],
+    "poisson": ["reconstructed"],
+    "voxelize": ["voxel_stats", "voxel_grid"],
+    "clip": ["clipped"],
+    "gradient": ["gradient_colors"],
+}
+DEPENDENCIES = {
+    "point_cloud": ["load"],
+    "lod": ["point_cloud"],
+    "poisson": ["lod"],
+    "voxelize": ["point_cloud"],
+    "clip": ["load"],
+    "gradient": ["load"],
+}
+
+
+def resolve_stages(requested) -> list:
+    """The requested stages plus their dependencies, in pipeline order."""
+    needed = set()
+    pending = list(requested or STAGES)
+    while pending:
+        name = pending.pop()
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}' (choose from {', '.join(STAGES)})")
+        if name not in needed:
+            needed.add(name)
+            pending.extend(DEPENDENCIES.get(name, []))
+    return [name for name in STAGES if name in needed]
+
+
+def _read_status_mb(field: str):
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS (VmHWM) so it can be read per stage; Linux only."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    peak = _read_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def release_finished(ctx, remaining) -> None:
+    needed = set()
+    for stage in remaining:
+        for dependency in DEPENDENCIES.get(stage, []):
+            needed.update(STAGE_OUTPUTS[dependency])
+    for keys in STAGE_OUTPUTS.values():
+        for key in keys:
+            if key not in needed:
+                ctx.pop(key, None)
+
+
+def process_model(model_path: str, output_root: str, stages=None, options=None) -> dict:
+    """Run the pipeline on one model; failures are recorded, not raised."""
+    opts = {**DEFAULT_OPTIONS, **(options or {})}
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    ctx = {"model_path": model_path, "output_dir": os.path.join(output_root, name)}
+    os.makedirs(ctx["output_dir"], exist_ok=True)
+
+    report = {"model": model_path, "output_dir": ctx["output_dir"], "stages": {}, "error": None}
+    started = time.perf_counter()
+    order = resolve_stages(stages)
+    for position, stage in enumerate(order):
+        # Without a reset (non-Linux) the peak is cumulative, not per stage.
+        per_stage_peak = reset_peak_rss()
+        stage_started = time.perf_counter()
+        try:
+            stats = STAGES[stage](ctx, opts)
+        except Exception as e:
+            report["error"] = f"{stage}: {e}"
+            report["traceback"] = traceback.format_exc()
+            break
+        report["stages"][stage] = {
+            "seconds": time.perf_counter() - stage_started,
+            "peak_rss_mb": peak_rss_mb(),
+            "rss_mb": _read_status_mb("VmRSS"),
+            "peak_is_per_stage": per_stage_peak,
+            **stats,
+        }
+        release_finished(ctx, order[position + 1:])
+    report["seconds"] = time.perf_counter() - started
+
+    with open(os.path.join(ctx["output_dir"], "timings.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def find_models(paths) -> list:
+    models = []
+    for path in paths:
+        if os.path.isdir(path):
+            models.extend(sorted(glob.glob(os.path.join(path, "**", "*.obj"), recursive=True)))
+        else:
+            models.append(path)
+    return models
+
+
+def run_batch(models, output_root: str, workers: int = 1, stages=None, options=None) -> list:
+    """Process ``models`` in ``workers`` processes and write ``summary.json``."""
+    os.makedirs(output_root, exist_ok=True)
+    reports = []
+
+    def record(report):
+        reports.append(report)
+        status = f"✗ {report['error']}" if report["error"] else "✓"
+        print(f"{status} {report['model']} ({report['seconds']:.1f}s)")
+
+    if workers <= 1:
+        for model in models:
+            record(process_model(model, output_root, stages, options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_model, model, output_root, stages, options) for model in models]
+            for future in as_completed(futures):
+                record(future.result())
+
+    reports.sort(key=lambda r: models.index(r["model"]))
+    with open(os.path.join(output_root, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(reports, f, indent=2)
+    return reports
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-process OBJ models without a GUI")
+    parser.add_argument("paths", nargs="+", help="OBJ files or directories searched for *.obj")
+    parser.add_argument("--output-dir", default="mesh_outputs")
+    parser.add_argument("--workers", type=int, default=1, help="models processed in parallel")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="stages to run (default: all)")
+    parser.add_argument("--poisson-depth", type=int, default=DEFAULT_OPTIONS["poisson_depth"])
+    parser.add_argument("--quality", choices=["preview", "final"], default=DEFAULT_OPTIONS["quality"],
+                        help="preview: small cloud, low Poisson depth; final: full budget and depth")
+    parser.add_argument("--point-budget", type=int, help="max points for the final level (default: all)")
+    parser.add_argument("--preview-budget", type=int, default=DEFAULT_OPTIONS["preview_point_budget"])
+    parser.add_argument("--preview-depth", type=int, default=DEFAULT_OPTIONS["poisson_preview_depth"])
+    parser.add_argument("--voxel-size", type=float, default=DEFAULT_OPTIONS["voxel_size"])
+    parser.add_argument("--voxel-sizes", type=float, nargs="+", default=[],
+                        help="additional voxel sizes computed in the same sweep")
+    parser.add_argument("--voxel-grid", action="store_true", help="also write an Open3D voxels.ply")
+    parser.add_argument("--clip-normal", type=float, nargs=3, default=DEFAULT_OPTIONS["clip_normal"])
+    parser.add_argument("--clip-point", type=float, nargs=3, help="point on the clip plane (default: mesh center)")
+    parser.add_argument("--no-write", action="store_true", help="only record timings, do not write geometry")
+    parser.add_argument("--cache-dir", default=DEFAULT_OPTIONS["cache_dir"], help="binary mesh cache directory")
+    parser.add_argument("--cache-max-gb", type=float, default=DEFAULT_OPTIONS["cache_max_bytes"] / 1024 ** 3)
+    parser.add_argument("--no-cache", action="store_true", help="always parse the OBJ files")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    models = find_models(args.paths)
+    if not models:
+        sys.exit("No OBJ models found")
+    options = {
+        "poisson_depth": args.poisson_depth,
+        "quality": args.quality,
+        "final_point_budget": args.point_budget,
+        "preview_point_budget": args.preview_budget,
+        "poisson_preview_depth": args.preview_depth,
+        "voxel_size": args.voxel_size,
+        "voxel_sizes": args.voxel_sizes,
+        "voxel_grid": args.voxel_grid,
+        "clip_normal": args.clip_normal,
+        "clip_point": args.clip_point,
+        "write_outputs": not args.no_write,
+        "cache_dir": None if args.no_cache else args.cache_dir,
+        "cache_max_bytes": int(args.cache_max_gb * 1024 ** 3),
+    }
+    reports = run_batch(models, args.output_dir, args.workers, args.stages, options)
+    failed = sum(1 for r in reports if r["error"])
+    print(f"\n{len(reports) - failed}/{len(reports)} models processed, results in {args.output_dir}/")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
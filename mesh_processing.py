@@ -0,0 +1,87 @@
+"""Array-level mesh operations shared by the 3D model steps (assignment5.py).
+
+Functions here work on plain NumPy arrays so they can be benchmarked and
+reused without Open3D; the ``*_mesh`` wrappers convert to and from
+``open3d.geometry.TriangleMesh``.
+"""
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def plane_side(vertices: np.ndarray, normal, point) -> np.ndarray:
+    """Signed distance (scaled by |normal|) of every vertex to the plane through ``point``."""
+    normal = np.asarray(normal, dtype=vertices.dtype)
+    return vertices @ normal - np.dot(np.asarray(point, dtype=vertices.dtype), normal)
+
+
+def clip_arrays(vertices: np.ndarray, triangles: np.ndarray, normal, point, attributes=()):
+    """Keep the part of a mesh on the positive side of a plane.
+
+    A vertex is kept when ``dot(v - point, normal) >= 0`` and a triangle
+    when all three of its vertices are kept. Kept vertices are renumbered
+    through an index remap array instead of a dict. ``attributes`` are
+    per-vertex arrays (normals, colors) clipped alongside the vertices.
+
+    Returns ``(vertices, triangles, attributes, kept_indices)``.
+    """
+    keep = plane_side(vertices, normal, point) >= 0
+    kept_indices = np.flatnonzero(keep)
+
+    remap = np.full(len(vertices), -1, dtype=triangles.dtype if len(triangles) else np.int64)
+    remap[kept_indices] = np.arange(len(kept_indices), dtype=remap.dtype)
+
+    triangle_mask = keep[triangles].all(axis=1)
+    clipped_triangles = remap[triangles[triangle_mask]]
+    clipped_attributes = [np.asarray(attr)[kept_indices] for attr in attributes]
+    return vertices[kept_indices], clipped_triangles, clipped_attributes, kept_indices
+
+
+def clip_mesh(mesh, normal, point):
+    """Clip an Open3D ``TriangleMesh`` with ``clip_arrays``; returns a new mesh."""
+    import open3d as o3d
+
+    attributes, names = [], []
+    if mesh.has_vertex_colors():
+        attributes.append(np.asarray(mesh.vertex_colors))
+        names.append("vertex_colors")
+    vertices, triangles, clipped, _ = clip_arrays(
+        np.asarray(mesh.vertices), np.asarray(mesh.triangles), normal, point, attributes)
+
+    clipped_mesh = o3d.geometry.TriangleMesh()
+    clipped_mesh.vertices = o3d.utility.Vector3dVector(vertices)
+    clipped_mesh.triangles = o3d.utility.Vector3iVector(triangles)
+    for name, values in zip(names, clipped):
+        setattr(clipped_mesh, name, o3d.utility.Vector3dVector(values))
+    return clipped_mesh
+
+
+@contextmanager
+def vertex_colors(mesh, colors):
+    """Temporarily give ``mesh`` per-vertex ``colors`` instead of copying the whole mesh.
+
+    Only the previous color array (if any) is saved; vertices, triangles and
+    normals stay shared.
+    """
+    import open3d as o3d
+
+    previous = np.array(mesh.vertex_colors) if mesh.has_vertex_colors() else None
+    mesh.vertex_colors = o3d.utility.Vector3dVector(np.ascontiguousarray(colors, dtype=np.float64))
+    try:
+        yield mesh
+    finally:
+        mesh.vertex_colors = o3d.utility.Vector3dVector(previous if previous is not None else np.empty((0, 3)))
+
+
+def uniform_colors(n_vertices: int, color) -> np.ndarray:
+    return np.broadcast_to(np.asarray(color, dtype=np.float64), (n_vertices, 3))
+
+
+def gradient_colors(values: np.ndarray) -> np.ndarray:
+    """Blue-to-red colors for ``values`` normalized to [0, 1]."""
+    lo, hi = values.min(), values.max()
+    normalized = (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values)
+    colors = np.zeros((len(values), 3))
+    colors[:, 0] = normalized
+    colors[:, 2] = 1 - normalized
+    return colors
@@ -0,0 +1,65 @@
+"""Apply the numbered SQL files in pevious_tasks/sql/migrations in order.
+
+Applied versions are recorded in ``schema_migrations``. Statements run in
+autocommit mode so migrations may use CREATE INDEX CONCURRENTLY; a
+migration is only recorded once all of its statements succeeded, and every
+statement is expected to be idempotent (IF NOT EXISTS) so a failed
+migration can simply be re-run.
+
+    python migrate.py
+"""
+import os
+
+import psycopg2
+
+from config import settings
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pevious_tasks", "sql", "migrations")
+
+
+def split_statements(sql: str) -> list:
+    # Migration files only contain plain DDL, so a line-based split is enough.
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def pending_migrations(conn) -> list:
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version text PRIMARY KEY,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        cur.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cur.fetchall()}
+    files = sorted(name for name in os.listdir(MIGRATIONS_DIR) if name.endswith(".sql"))
+    return [name for name in files if name[:-4] not in applied]
+
+
+def apply_migrations(conn) -> list:
+    conn.autocommit = True
+    applied = []
+    for name in pending_migrations(conn):
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+            statements = split_statements(f.read())
+        print(f"Applying {name} ({len(statements)} statements)")
+        with conn.cursor() as cur:
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (name[:-4],))
+        applied.append(name)
+    return applied
+
+
+def main():
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    try:
+        applied = apply_migrations(conn)
+        print(f"{len(applied)} migration(s) applied" if applied else "Database is up to date")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,120 +1,23 @@
-import psycopg2
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from config import settings
+from chart_data import histogram_query, numpy_histogram
+from columnar import copy_frame, frame_columns, frame_preview
+from chart_rendering import CHART_TYPES, ChartRenderer, chart_filename, render_chart
+from db_pool import create_pool
+from query_cache import QueryCache
+from query_plans import explain_analyze, record_plan
+from report_metrics import ReportMetrics
+import rollups
+from result_stream import ColumnCollector, RowPreview, iter_chunks
 from tabulate import tabulate
-import matplotlib.pyplot as plt
 import os
+import sys
+import time
+import uuid
 
 
-class DatabaseAnalytics:
-    def __init__(self):
-        self.db_params = {
-            "dbname": settings.DB_NAME,
-            "user": settings.DB_USER,
-            "password": settings.DB_PASSWORD,
-            "host": settings.DB_HOST,
-            "port": settings.DB_PORT
-        }
-        self.charts_dir = "charts"
-        os.makedirs(self.charts_dir, exist_ok=True)
-
-    def execute_query(self, query: str, description: str, chart_type: str = None) -> None:
-        try:
-            with psycopg2.connect(**self.db_params) as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query)
-                    rows = cur.fetchall()
-                    headers = [desc[0] for desc in cur.description]
-
-                    print(f"\n=== {description} ===")
-                    print(tabulate(rows, headers=headers, tablefmt="grid"))
-                    print(f"Rows fetched: {len(rows)}")
-
-                    # Если указан тип графика → рисуем
-                    if chart_type and rows:
-                        self.create_chart(rows, headers, description, chart_type)
-
-        except Exception as e:
-            print(f"Error executing query [{description}]: {e}")
-
-    def create_chart(self, rows, headers, description, chart_type):
-        filename = os.path.join(self.charts_dir, f"{description.replace(' ', '_')}.png")
-
-        if chart_type == "pie":
-            labels = [row[0] for row in rows]
-            sizes = [row[1] for row in rows]
-
-            plt.figure(figsize=(8, 8))
-            plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-            plt.title(description)
-            plt.legend(labels, title=headers[0])
-
-        elif chart_type == "bar":
-            labels = [row[0] for row in rows]
-            values = [row[1] for row in rows]
-
-            plt.figure(figsize=(10, 6))
-            plt.bar(labels, values)
-            plt.xlabel(headers[0])
-            plt.ylabel(headers[1])
-            plt.title(description)
-            plt.xticks(rotation=45, ha="right")
-
-        elif chart_type == "barh":
-            labels = [row[0] for row in rows]
-            values = [row[1] for row in rows]
-
-            plt.figure(figsize=(10, 6))
-            plt.barh(labels, values)
-            plt.xlabel(headers[1])
-            plt.ylabel(headers[0])
-            plt.title(description)
-
-        elif chart_type == "line":
-            x = [row[0] for row in rows]
-            y = [row[1] for row in rows]
-
-            plt.figure(figsize=(10, 6))
-            plt.plot(x, y, marker="o", label=headers[1])
-            plt.xlabel(headers[0])
-            plt.ylabel(headers[1])
-            plt.title(description)
-            plt.xticks(rotation=45, ha="right")
-            plt.legend()
-
-        elif chart_type == "hist":
-            values = [row[0] for row in rows]
-
-            plt.figure(figsize=(10, 6))
-            plt.hist(values, bins=10, edgecolor="black")
-            plt.xlabel(headers[0])
-            plt.ylabel("Frequency")
-            plt.title(description)
-
-        elif chart_type == "scatter":
-            # Используем данные из запроса: total_orders (X) и avg_score (Y)
-            x = [row[0] for row in rows]
-            y = [row[1] for row in rows]
-
-            plt.figure(figsize=(10, 6))
-            plt.scatter(x, y, alpha=0.7)
-
-            plt.xlabel(headers[0])  # total_orders
-            plt.ylabel(headers[1])  # avg_score
-            plt.title(description)
-            plt.grid(True, linestyle="--", alpha=0.6)
-
-        else:
-            print(f"Chart type '{chart_type}' is not supported.")
-            return
-
-        plt.tight_layout()
-        plt.savefig(filename)
-        plt.close()
-
-        print(f"Chart saved: {filename} ({chart_type} showing {description})")
-
-    def run_analytics(self):
-        queries = [
+REPORTS = [
     {
         "query": """
             SELECT 
@@ -144,24 +47,41 @@ class DatabaseAnalytics:
         """,
         "description": "Top Selling Product Categories",
         "chart_type": "bar",
+        "rollup": "daily_category_sales",
+        "rollup_query": """
+            SELECT 
+                NULLIF(product_category_name, '') as product_category_name,
+                SUM(total_sales) as total_sales
+            FROM rollup_daily_category_sales
+            GROUP BY product_category_name
+            ORDER BY total_sales DESC
+            LIMIT 10;
+        """,
         "insight": "Shows which product categories generate the highest sales volume across orders."
     },
     {
         "query": """
+            WITH order_totals AS (
+                SELECT 
+                    op.order_id,
+                    SUM(op.payment_value) as order_value
+                FROM olist_order_payments op
+                GROUP BY op.order_id
+            )
             SELECT 
                 c.customer_state,
-                ROUND(AVG(op.payment_value)::numeric, 2) as avg_order_value
-            FROM olist_orders o
+                ROUND(AVG(ot.order_value)::numeric, 2) as avg_order_value
+            FROM order_totals ot
+            JOIN olist_orders o ON ot.order_id = o.order_id
             JOIN olist_customers c ON o.customer_id = c.customer_id
-            JOIN olist_order_payments op ON o.order_id = op.order_id
-            JOIN olist_order_items oi ON o.order_id = oi.order_id
+            WHERE EXISTS (SELECT 1 FROM olist_order_items oi WHERE oi.order_id = o.order_id)
             GROUP BY c.customer_state
             ORDER BY avg_order_value DESC
             LIMIT 10;
         """,
         "description": "Average Order Value by State",
         "chart_type": "barh",
-        "insight": "Compares customer states by average order value, including data from payments and items."
+        "insight": "Compares customer states by average order value (all payments of an order summed, orders with items only)."
     },
     {
         "query": """
@@ -176,57 +96,413 @@ class DatabaseAnalytics:
         """,
         "description": "Monthly Sales Trend",
         "chart_type": "line",
+        "rollup": "daily_sales",
+        "rollup_query": """
+            SELECT 
+                DATE_TRUNC('month', day::timestamp) as month,
+                ROUND(SUM(total_revenue)::numeric, 2) as total_revenue
+            FROM rollup_daily_sales
+            GROUP BY month
+            ORDER BY month;
+        """,
         "insight": "Shows how revenue changes month by month across all customers."
     },
     {
         "query": """
             SELECT 
-                subq.purchases
-            FROM (
-                SELECT 
-                    c.customer_id,
-                    COUNT(o.order_id) as purchases
-                FROM olist_customers c
-                JOIN olist_orders o ON c.customer_id = o.customer_id
-                JOIN olist_order_items oi ON o.order_id = oi.order_id
-                GROUP BY c.customer_id
-            ) subq
-            ORDER BY subq.purchases;
+                COUNT(*) as purchases
+            FROM olist_orders o
+            JOIN olist_customers c ON o.customer_id = c.customer_id
+            WHERE EXISTS (SELECT 1 FROM olist_order_items oi WHERE oi.order_id = o.order_id)
+            GROUP BY c.customer_unique_id;
         """,
         "description": "Customer Purchase Frequency",
         "chart_type": "hist",
-        "insight": "Shows how frequently customers make repeat purchases (based on orders and items)."
+        "hist_column": "purchases",
+        "insight": "Shows how frequently customers make repeat purchases (orders per unique customer, orders with items only)."
     },
     {
         "query": """
+            WITH seller_orders AS (
+                SELECT DISTINCT oi.seller_id, oi.order_id
+                FROM olist_order_items oi
+            ),
+            order_reviews AS (
+                SELECT 
+                    r.order_id,
+                    AVG(r.review_score) as review_score,
+                    COUNT(*) as reviews
+                FROM olist_order_reviews r
+                GROUP BY r.order_id
+            )
             SELECT 
-                COUNT(DISTINCT oi.order_id) as total_orders,
-                ROUND(AVG(r.review_score)::numeric, 2) as avg_score
-            FROM olist_sellers s
-            JOIN olist_order_items oi ON s.seller_id = oi.seller_id
-            JOIN olist_orders o ON oi.order_id = o.order_id
-            LEFT JOIN olist_order_reviews r ON o.order_id = r.order_id
-            GROUP BY s.seller_id
-            HAVING COUNT(r.review_id) > 10
+                COUNT(*) as total_orders,
+                ROUND(AVG(orv.review_score)::numeric, 2) as avg_score
+            FROM seller_orders so
+            LEFT JOIN order_reviews orv ON so.order_id = orv.order_id
+            GROUP BY so.seller_id
+            HAVING SUM(orv.reviews) > 10
             ORDER BY total_orders DESC
             LIMIT 50;
         """,
         "description": "Top Sellers by Satisfaction and Volume",
         "chart_type": "scatter",
-        "insight": "Each point represents a seller: number of orders vs average review score (using LEFT JOIN for reviews)."
+        "insight": "Each point represents a seller: number of orders vs average review score per order (using LEFT JOIN for reviews)."
     }
 ]
 
 
-        for q in queries:
-            print(f"\n>>> Running analysis: {q['description']}")
-            self.execute_query(q["query"], q["description"], chart_type=q["chart_type"])
-            print(f"Insight: {q['insight']}")
+class DatabaseAnalytics:
+    def __init__(self):
+        self.pool = create_pool(settings)
+        self.cache = QueryCache.from_settings(settings)
+        self.metrics = ReportMetrics.from_settings(settings)
+        self.fresh_rollups = set()
+        self.charts_dir = "charts"
+        os.makedirs(self.charts_dir, exist_ok=True)
+        self.renderer = ChartRenderer(self.charts_dir, settings.CHART_RENDER_WORKERS,
+                                      settings.CHART_SKIP_UNCHANGED)
+
+    def execute_query(self, query: str, description: str, chart_type: str = None) -> None:
+        report = {"query": query, "description": description, "chart_type": chart_type}
+        result = self.fetch_report(report)
+        self.print_report(report, result)
+        self.collect_charts([result])
+
+    def create_chart(self, rows, headers, description, chart_type, columns=None, bins=None):
+        """Render one chart synchronously, in this process."""
+        if columns is None:
+            columns = list(zip(*rows))
+        if chart_type not in CHART_TYPES:
+            print(f"Chart type '{chart_type}' is not supported.")
+            return
+        filename = chart_filename(self.charts_dir, description)
+        with self.metrics.span(description, "chart", chart_type=chart_type):
+            timings = render_chart(filename, headers, description, chart_type,
+                                   self._chart_columns(chart_type, columns, bins))
+        self.metrics.observe(description, "save", timings["save_time"])
+        print(f"Chart saved: {filename} ({chart_type} showing {description})")
+
+    def submit_chart(self, report: dict, result: dict) -> None:
+        """Queue a report's chart on the renderer; ``collect_charts`` waits for it."""
+        chart_type = report["chart_type"]
+        if chart_type not in CHART_TYPES:
+            print(f"Chart type '{chart_type}' is not supported.")
+            return
+        result["chart"] = self.renderer.submit(result["headers"], report["description"], chart_type,
+                                               self._chart_columns(chart_type, result["columns"],
+                                                                   self._hist_bins(report)))
+
+    def _chart_columns(self, chart_type, columns, bins=None):
+        if chart_type == "hist" and len(columns) < 3:
+            return numpy_histogram(columns[0], bins or settings.CHART_HIST_BINS)
+        return columns
+
+    def collect_charts(self, results) -> None:
+        for result in results:
+            future = result.get("chart")
+            description = result["description"]
+            if future is None:
+                if result["error"] is None:
+                    self.metrics.record_success(description)
+                continue
+            try:
+                chart = future.result()
+            except Exception as e:
+                result["error"] = e
+                self.metrics.observe(description, "chart", 0.0, status="error")
+                print(f"Error rendering chart [{description}]: {e}")
+                continue
+            result["chart_time"] = chart["draw_time"] + chart["save_time"]
+            if chart.get("unchanged"):
+                result["chart_unchanged"] = True
+                print(f"Chart unchanged: {chart['filename']}")
+            else:
+                self.metrics.observe(description, "chart", result["chart_time"])
+                self.metrics.observe(description, "save", chart["save_time"])
+                print(f"Chart saved: {chart['filename']}")
+            if result["error"] is None:
+                self.metrics.record_success(description)
+
+    def fetch_columns(self, query: str, params=None):
+        """Run a query via COPY and return a DataFrame of typed NumPy columns."""
+        with self.pool.connection() as conn:
+            return copy_frame(conn, query, params)
+
+    def fetch_report(self, report: dict, streaming: bool = None) -> dict:
+        """Run one report query and return its results; errors are captured, not raised.
+
+        In streaming mode the rows are read through a named (server-side)
+        cursor in ``ANALYTICS_ITERSIZE`` chunks, so only the preview and the
+        chart columns are kept in memory. When the result cache is enabled a
+        still-valid cached result is returned without running the query.
+        """
+        if streaming is None:
+            streaming = settings.ANALYTICS_STREAMING
+        query, binned = self._report_query(report)
+        result = {
+            "description": report["description"],
+            "headers": [],
+            "preview": RowPreview(settings.ANALYTICS_PREVIEW_ROWS),
+            "columns": [],
+            "row_count": 0,
+            "cached": False,
+            "error": None,
+            "query_time": 0.0,
+            "render_time": 0.0,
+            "chart": None,
+            "chart_time": None,
+            "chart_unchanged": False,
+        }
+        # The preview size changes what is stored, so it is part of the key.
+        cache_params = (settings.ANALYTICS_PREVIEW_ROWS,)
+        started = time.perf_counter()
+        try:
+            with self.metrics.span(report["description"], "report", streaming=streaming) as span, \
+                    self.pool.connection() as conn:
+                payload = None
+                if self.cache is not None:
+                    hit, value = self.cache.get(conn, query, cache_params)
+                    if hit:
+                        payload = value
+                        result["cached"] = True
+                        span["cached"] = True
+                    else:
+                        fingerprint = value
+                if payload is None:
+                    payload = self._read_result(conn, report, query, binned, streaming)
+                    if self.cache is not None:
+                        self.cache.put(query, payload, fingerprint, cache_params,
+                                       row_count=payload["row_count"])
+                span["rows"] = payload["row_count"]
+            result.update(payload)
+            self.metrics.record_rows(report["description"], result["row_count"])
+        except Exception as e:
+            result["error"] = e
+        result["query_time"] = time.perf_counter() - started
+        return result
+
+    def _read_result(self, conn, report: dict, query: str, binned: bool, streaming: bool) -> dict:
+        if settings.ANALYTICS_COLUMNAR:
+            return self._read_columnar(conn, report, query, binned)
+        itersize = settings.ANALYTICS_ITERSIZE
+        preview = RowPreview(settings.ANALYTICS_PREVIEW_ROWS)
+        collector = ColumnCollector(3 if binned else 2)
+        headers = []
+        cursor_name = f"report_{uuid.uuid4().hex}" if streaming else None
+        description = report["description"]
+        with conn.cursor(name=cursor_name) as cur:
+            if streaming:
+                cur.itersize = itersize
+            # For named cursors execute() only declares the cursor; the
+            # server-side work then shows up under "fetch".
+            with self.metrics.span(description, "query"):
+                cur.execute(query)
+            with self.metrics.span(description, "fetch"):
+                chunks = iter_chunks(cur, itersize) if streaming else [cur.fetchall()]
+                for chunk in chunks:
+                    preview.add(chunk)
+                    if report.get("chart_type"):
+                        collector.add(chunk)
+            # Named cursors only fill in description after the first fetch.
+            if cur.description:
+                headers = [desc[0] for desc in cur.description]
+
+        columns = collector.columns
+        if report.get("chart_type") == "hist" and not binned:
+            # Raw values came back (no pushdown); bin them on the client.
+            columns = numpy_histogram(columns[0], self._hist_bins(report))
+        return {"headers": headers, "preview": preview, "columns": columns, "row_count": preview.row_count}
+
+    def _read_columnar(self, conn, report: dict, query: str, binned: bool) -> dict:
+        description = report["description"]
+        # COPY runs and streams in one step, so there is no separate "query" span.
+        with self.metrics.span(description, "fetch", mode="copy"):
+            df = copy_frame(conn, query)
+        columns = frame_columns(df, 3 if binned else 2) if report.get("chart_type") else []
+        if report.get("chart_type") == "hist" and not binned:
+            columns = numpy_histogram(columns[0], self._hist_bins(report))
+        return {"headers": list(df.columns), "preview": frame_preview(df, settings.ANALYTICS_PREVIEW_ROWS),
+                "columns": columns, "row_count": len(df)}
+
+    def _hist_bins(self, report: dict) -> int:
+        return report.get("bins", settings.CHART_HIST_BINS)
+
+    def _report_query(self, report: dict):
+        """Return the SQL to run for a report and whether it is already binned."""
+        if report.get("rollup") in self.fresh_rollups:
+            return report["rollup_query"], False
+        if (report.get("chart_type") == "hist" and report.get("hist_column")
+                and settings.CHART_HIST_PUSHDOWN):
+            return histogram_query(report["query"], report["hist_column"], self._hist_bins(report)), True
+        return report["query"], False
+
+    def print_report(self, report: dict, result: dict) -> None:
+        started = time.perf_counter()
+        description = report["description"]
+        if result["error"] is not None:
+            print(f"Error executing query [{description}]: {result['error']}")
+        else:
+            preview, headers = result["preview"], result["headers"]
+            with self.metrics.span(description, "render"):
+                table = preview.render(headers)
+            print(f"\n=== {description} ===")
+            print(table)
+            if preview.truncated:
+                print(f"Rows fetched: {result['row_count']} (showing first {len(preview.head)} "
+                      f"and last {len(preview.tail)})")
+            else:
+                print(f"Rows fetched: {result['row_count']}")
+
+            # Если указан тип графика → рисуем (в фоне, см. collect_charts)
+            if report.get("chart_type") and result["row_count"]:
+                self.submit_chart(report, result)
+        result["render_time"] = time.perf_counter() - started
+
+    def run_analytics(self, parallel: bool = None, max_workers: int = None):
+        if parallel is None:
+            parallel = settings.ANALYTICS_PARALLEL
+        if max_workers is None:
+            max_workers = settings.ANALYTICS_MAX_WORKERS
+        # More workers than pooled connections would only queue on checkout.
+        max_workers = max(1, min(max_workers, self.pool.max_size))
+
+        started = time.perf_counter()
+        self.check_rollups()
+        results = []
+        if parallel:
+            # Queries run concurrently; printing stays on this thread, in
+            # report order, and charts render in the renderer's processes.
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self.fetch_report, report) for report in REPORTS]
+                for report, future in zip(REPORTS, futures):
+                    results.append(self._report_section(report, future.result()))
+        else:
+            for report in REPORTS:
+                results.append(self._report_section(report, self.fetch_report(report)))
+        self.collect_charts(results)
+
+        self.print_summary(results, time.perf_counter() - started, parallel, max_workers)
+        self.print_pool_stats()
+        if self.cache is not None:
+            self.print_cache_stats()
+        self.export_metrics()
+        return results
+
+    def check_rollups(self):
+        """Decide once per run which reports can read from the rollup tables."""
+        self.fresh_rollups = set()
+        if not settings.ROLLUPS_ENABLED:
+            return
+        try:
+            with self.pool.connection() as conn:
+                if settings.ROLLUPS_AUTO_REFRESH:
+                    rollups.refresh(conn)
+                self.fresh_rollups = rollups.fresh_rollups(conn, settings.ROLLUP_MAX_AGE)
+        except Exception as e:
+            print(f"Rollups unavailable, using base tables: {e}")
+        if self.fresh_rollups:
+            print(f"Using fresh rollups: {', '.join(sorted(self.fresh_rollups))}")
+
+    def _report_section(self, report: dict, result: dict) -> dict:
+        print(f"\n>>> Running analysis: {report['description']}")
+        self.print_report(report, result)
+        print(f"Insight: {report['insight']}")
+        return result
 
+    def print_summary(self, results, wall_time, parallel, max_workers):
+        rows = [
+            [
+                r["description"],
+                "error" if r["error"] is not None else "ok",
+                "hit" if r["cached"] else "miss",
+                r["row_count"],
+                round(r["query_time"] * 1000, 1),
+                round(r["render_time"] * 1000, 1),
+                "unchanged" if r["chart_unchanged"] else
+                ("" if r["chart_time"] is None else round(r["chart_time"] * 1000, 1)),
+            ]
+            for r in results
+        ]
+        mode = f"parallel, {max_workers} workers" if parallel else "sequential"
+        print(f"\n=== Report Timings ({mode}) ===")
+        print(tabulate(rows, headers=["report", "status", "cache", "rows", "query ms", "render ms", "chart ms"], tablefmt="grid"))
+        print(f"Total wall time: {wall_time:.2f}s")
 
-def main():
+    def explain_reports(self, plans_dir: str = "plans"):
+        """Record EXPLAIN (ANALYZE, BUFFERS) plans for every report so regressions can be tracked."""
+        recorded_at = datetime.now()
+        rows = []
+        for report in REPORTS:
+            query, _ = self._report_query(report)
+            try:
+                with self.pool.connection() as conn:
+                    plan = explain_analyze(conn, query)
+                summary = record_plan(plans_dir, report["description"], query, plan, recorded_at)
+                rows.append([report["description"], summary["node"], summary["rows"],
+                             round(summary["execution_ms"], 1), summary["shared_hit_blocks"],
+                             summary["shared_read_blocks"]])
+            except Exception as e:
+                print(f"Error explaining query [{report['description']}]: {e}")
+        print(f"\n=== Query Plans (saved to {plans_dir}/) ===")
+        print(tabulate(rows, headers=["report", "top node", "rows", "exec ms", "shared hit", "shared read"],
+                       tablefmt="grid"))
+
+    def print_pool_stats(self):
+        stats = self.pool.get_stats()
+        print("\n=== Connection Pool ===")
+        print(tabulate([
+            ["checkouts", stats["checkouts"]],
+            ["connections created", stats["created"]],
+            ["max in use", stats["in_use_max"]],
+            ["avg wait (ms)", round(stats["wait_time_avg"] * 1000, 2)],
+            ["max wait (ms)", round(stats["wait_time_max"] * 1000, 2)],
+            ["checkout timeouts", stats["timeouts"]],
+            ["health check failures", stats["health_check_failures"]],
+        ], headers=["metric", "value"], tablefmt="grid"))
+
+    def print_cache_stats(self):
+        stats = self.cache.get_stats()
+        print("\n=== Result Cache ===")
+        print(tabulate([
+            ["hits", stats["hits"]],
+            ["misses", stats["misses"]],
+            ["hit ratio", f"{stats['hit_ratio']:.0%}"],
+            ["expired (TTL)", stats["expired"]],
+            ["invalidated (table changed)", stats["invalidated"]],
+            ["stored", stats["stores"]],
+            ["not stored (too large)", stats["skipped"]],
+        ], headers=["metric", "value"], tablefmt="grid"))
+
+    def export_metrics(self):
+        """Write/push the report metrics; a one-shot run ends before Prometheus could scrape it."""
+        textfile, gateway = settings.REPORT_METRICS_TEXTFILE, settings.REPORT_METRICS_PUSHGATEWAY
+        try:
+            self.metrics.export(textfile=textfile or None, pushgateway=gateway or None)
+        except Exception as e:
+            print(f"⚠ Could not export report metrics: {e}")
+            return
+        if textfile:
+            print(f"Report metrics written to {textfile}")
+        if gateway:
+            print(f"Report metrics pushed to {gateway}")
+
+    def close(self):
+        self.renderer.close()
+        self.pool.close()
+        self.metrics.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
     analytics = DatabaseAnalytics()
-    analytics.run_analytics()
+    try:
+        if "--explain" in argv:
+            analytics.explain_reports()
+        else:
+            analytics.run_analytics()
+    finally:
+        analytics.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def histogram_query(query: str, column: str, bins: int) -> str:
+    """Wrap a report query so the database returns histogram buckets instead of raw values.
+
+    The result has one row per bucket (bucket start named after ``column``,
+    ``<column>_to`` and ``frequency``), with the same edges as ``numpy.histogram(values, bins)``:
+    ``bins`` equal-width buckets between MIN and MAX, the last one closed. As in NumPy,
+    a constant column is binned over ``value - 0.5 .. value + 0.5``.
+    """
+    inner = query.strip().rstrip(";")
+    return f"""
+        WITH src AS (
+            {inner}
+        ),
+        extent AS (
+            SELECT MIN({column})::float8 AS lo, MAX({column})::float8 AS hi
+            FROM src
+        ),
+        bounds AS (
+            SELECT
+                CASE WHEN hi = lo THEN lo - 0.5 ELSE lo END AS lo,
+                CASE WHEN hi = lo THEN hi + 0.5 ELSE hi END AS hi
+            FROM extent
+        ),
+        buckets AS (
+            SELECT
+                LEAST(width_bucket(s.{column}::float8, b.lo, b.hi, {bins}), {bins}) AS bucket,
+                COUNT(*) AS frequency
+            FROM src s
+            CROSS JOIN bounds b
+            WHERE s.{column} IS NOT NULL
+            GROUP BY 1
+        )
+        SELECT
+            b.lo + (g.bucket - 1) * (b.hi - b.lo) / {bins} AS {column},
+            b.lo + g.bucket * (b.hi - b.lo) / {bins} AS {column}_to,
+            COALESCE(k.frequency, 0) AS frequency
+        FROM bounds b
+        CROSS JOIN generate_series(1, {bins}) AS g(bucket)
+        LEFT JOIN buckets k ON k.bucket = g.bucket
+        WHERE b.lo IS NOT NULL
+        ORDER BY g.bucket;
+    """
+
+
+def numpy_histogram(values, bins: int) -> list:
+    """Bin a column of values in NumPy; returns the same columns as ``histogram_query``."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return [[], [], []]
+    counts, edges = np.histogram(values, bins=bins)
+    return [edges[:-1].tolist(), edges[1:].tolist(), counts.tolist()]
+
+
+def numeric_column(values) -> np.ndarray:
+    """Convert a fetched column (often ``Decimal`` from ROUND()) to a float array in one pass."""
+    return np.asarray(values, dtype=float)
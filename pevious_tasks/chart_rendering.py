@@ -0,0 +1,182 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.artist import setp
+from matplotlib.figure import Figure
+
+from chart_data import numeric_column
+
+CHART_TYPES = ("pie", "bar", "barh", "line", "hist", "scatter")
+# Bump when the drawing code changes so existing PNGs are re-rendered.
+RENDERER_VERSION = 1
+MANIFEST_NAME = ".manifest.json"
+
+
+def chart_filename(charts_dir: str, description: str) -> str:
+    return os.path.join(charts_dir, f"{description.replace(' ', '_')}.png")
+
+
+def content_hash(headers, description, chart_type, columns) -> str:
+    digest = hashlib.sha256(json.dumps([RENDERER_VERSION, list(headers), description, chart_type]).encode("utf-8"))
+    for column in columns:
+        if isinstance(column, np.ndarray) and column.dtype != object:
+            # Columnar results: hash the buffer instead of boxing every value.
+            digest.update(column.dtype.str.encode("ascii"))
+            digest.update(np.ascontiguousarray(column).tobytes())
+        else:
+            digest.update(json.dumps(list(column), default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def draw_chart(fig, headers, description, chart_type, columns) -> None:
+    """Draw one report chart on ``fig`` using only the object-oriented API."""
+    if chart_type == "pie":
+        labels = columns[0]
+        sizes = numeric_column(columns[1])
+
+        ax = fig.add_subplot()
+        ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
+        ax.set_title(description)
+        ax.legend(labels, title=headers[0])
+
+    elif chart_type == "bar":
+        labels = columns[0]
+        values = numeric_column(columns[1])
+
+        ax = fig.add_subplot()
+        ax.bar(labels, values)
+        ax.set_xlabel(headers[0])
+        ax.set_ylabel(headers[1])
+        ax.set_title(description)
+        setp(ax.get_xticklabels(), rotation=45, ha="right")
+
+    elif chart_type == "barh":
+        labels = columns[0]
+        values = numeric_column(columns[1])
+
+        ax = fig.add_subplot()
+        ax.barh(labels, values)
+        ax.set_xlabel(headers[1])
+        ax.set_ylabel(headers[0])
+        ax.set_title(description)
+
+    elif chart_type == "line":
+        x = columns[0]
+        y = numeric_column(columns[1])
+
+        ax = fig.add_subplot()
+        ax.plot(x, y, marker="o", label=headers[1])
+        ax.set_xlabel(headers[0])
+        ax.set_ylabel(headers[1])
+        ax.set_title(description)
+        setp(ax.get_xticklabels(), rotation=45, ha="right")
+        ax.legend()
+
+    elif chart_type == "hist":
+        # Columns are pre-binned: bucket start, bucket end, frequency.
+        starts, ends, counts = columns[0], columns[1], columns[2]
+        edges = list(starts) + [ends[-1]]
+
+        ax = fig.add_subplot()
+        ax.hist(starts, bins=edges, weights=counts, edgecolor="black")
+        ax.set_xlabel(headers[0])
+        ax.set_ylabel("Frequency")
+        ax.set_title(description)
+
+    elif chart_type == "scatter":
+        x = numeric_column(columns[0])
+        y = numeric_column(columns[1])
+
+        ax = fig.add_subplot()
+        ax.scatter(x, y, alpha=0.7)
+        ax.set_xlabel(headers[0])
+        ax.set_ylabel(headers[1])
+        ax.set_title(description)
+        ax.grid(True, linestyle="--", alpha=0.6)
+
+    else:
+        raise ValueError(f"Chart type '{chart_type}' is not supported.")
+
+
+def render_chart(filename, headers, description, chart_type, columns) -> dict:
+    """Draw and save one chart; runs in a worker process, so it must not use pyplot."""
+    started = time.perf_counter()
+    fig = Figure(figsize=(8, 8) if chart_type == "pie" else (10, 6))
+    draw_chart(fig, headers, description, chart_type, columns)
+    fig.tight_layout()
+    drawn = time.perf_counter()
+    fig.savefig(filename)
+    return {"filename": filename, "draw_time": drawn - started, "save_time": time.perf_counter() - drawn}
+
+
+class ChartRenderer:
+    """Renders charts in a process pool and skips charts whose data has not changed.
+
+    ``submit`` returns a future resolving to the ``render_chart`` dict, with
+    ``unchanged=True`` when the PNG on disk was rendered from the same content
+    hash (tracked in ``charts_dir/.manifest.json``). With ``workers <= 1``
+    charts are rendered inline.
+    """
+
+    def __init__(self, charts_dir: str, workers: int = None, skip_unchanged: bool = True):
+        self.charts_dir = charts_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.skip_unchanged = skip_unchanged
+        self.manifest_path = os.path.join(charts_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest() if skip_unchanged else {}
+        self._executor = None
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def submit(self, headers, description, chart_type, columns) -> Future:
+        filename = chart_filename(self.charts_dir, description)
+        columns = [column if isinstance(column, np.ndarray) else list(column) for column in columns]
+        digest = content_hash(headers, description, chart_type, columns)
+        if self.skip_unchanged and self.manifest.get(filename) == digest and os.path.exists(filename):
+            future = Future()
+            future.set_result({"filename": filename, "unchanged": True, "draw_time": 0.0, "save_time": 0.0})
+            return future
+
+        if self.workers <= 1:
+            future = Future()
+            try:
+                future.set_result(render_chart(filename, headers, description, chart_type, columns))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            if self._executor is None:
+                # spawn, not fork: the parent has query threads and open
+                # database connections that must not be duplicated.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            future = self._executor.submit(render_chart, filename, list(headers), description,
+                                           chart_type, columns)
+        future.add_done_callback(lambda f: self._record(f, filename, digest))
+        return future
+
+    def _record(self, future, filename, digest) -> None:
+        if self.skip_unchanged and not future.cancelled() and future.exception() is None:
+            self.manifest[filename] = digest
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.skip_unchanged:
+            self._save_manifest()
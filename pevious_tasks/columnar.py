@@ -0,0 +1,74 @@
+import tempfile
+
+import pandas as pd
+
+from result_stream import RowPreview
+
+# Postgres type OIDs that need an explicit dtype when parsing COPY's CSV.
+TEXT_OIDS = {18, 19, 25, 1042, 1043}          # char, name, text, bpchar, varchar
+FLOAT_OIDS = {700, 701, 1700}                  # float4, float8, numeric
+BOOL_OIDS = {16}
+DATETIME_OIDS = {1082, 1114, 1184}             # date, timestamp, timestamptz
+
+# COPY output is spooled in memory up to this size, then to a temp file.
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+def copy_frame(conn, query: str, params=None) -> pd.DataFrame:
+    """Run ``query`` through ``COPY ... TO STDOUT`` and parse it into a typed DataFrame.
+
+    Rows never become Python tuples: Postgres streams CSV, pandas' C parser
+    builds one NumPy array per column. Column types come from a ``LIMIT 0``
+    run of the same query, so text stays text (zip codes, ids), numerics
+    become float64 and dates/timestamps datetime64.
+    """
+    inner = query.strip().rstrip(";")
+    with conn.cursor() as cur:
+        if params is not None:
+            # COPY does not take bind parameters; inline them safely.
+            inner = cur.mogrify(inner, params).decode()
+        cur.execute(f"SELECT * FROM ({inner}) AS q LIMIT 0")
+        columns = [(desc[0], desc[1]) for desc in cur.description]
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b") as buf:
+            cur.copy_expert(f"COPY ({inner}) TO STDOUT WITH (FORMAT csv, HEADER false)", buf)
+            buf.seek(0)
+            return _parse_csv(buf, columns)
+
+
+def _parse_csv(buf, columns) -> pd.DataFrame:
+    names = [name for name, _ in columns]
+    dtypes, parse_dates = {}, []
+    for name, oid in columns:
+        if oid in TEXT_OIDS:
+            dtypes[name] = "object"
+        elif oid in FLOAT_OIDS:
+            dtypes[name] = "float64"
+        elif oid in BOOL_OIDS:
+            dtypes[name] = "boolean"
+        elif oid in DATETIME_OIDS:
+            parse_dates.append(name)
+    if len(set(names)) != len(names):
+        # Duplicate column names (e.g. two "count" columns) cannot key dtypes.
+        return pd.read_csv(buf, header=None, names=names, true_values=["t"], false_values=["f"])
+    return pd.read_csv(buf, header=None, names=names, dtype=dtypes, parse_dates=parse_dates,
+                       true_values=["t"], false_values=["f"])
+
+
+def frame_columns(df: pd.DataFrame, n_columns: int) -> list:
+    """The first ``n_columns`` columns as NumPy arrays, for charting."""
+    return [df.iloc[:, i].to_numpy() for i in range(min(n_columns, df.shape[1]))]
+
+
+def frame_preview(df: pd.DataFrame, preview_rows: int) -> RowPreview:
+    """Build the same head/tail preview ``RowPreview`` keeps for streamed results."""
+    preview = RowPreview(preview_rows)
+    if not preview_rows:
+        preview.add(list(df.itertuples(index=False, name=None)))
+        return preview
+    head = df.iloc[:preview_rows]
+    tail = df.iloc[preview_rows:].iloc[-preview_rows:]
+    preview.add(list(head.itertuples(index=False, name=None)))
+    preview.add(list(tail.itertuples(index=False, name=None)))
+    preview.row_count = len(df)
+    return preview
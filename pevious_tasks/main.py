@@ -1,57 +1,62 @@
-import psycopg2
 from config import settings
+from db_pool import create_pool
+from sql_runner import ScriptRunner, split_sql
 from tabulate import tabulate
+import os
+import time
+
+QUERIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql', 'queries.sql')
+
+
+def load_statements(path: str = QUERIES_FILE):
+    """Return the parsed statements of a .sql file (see sql_runner.split_sql)."""
+    with open(path, 'r') as file:
+        return split_sql(file.read())
+
+
+def load_queries(path: str = QUERIES_FILE):
+    """Return (description, query) pairs from a .sql file of `--`-commented statements."""
+    return [(stmt["description"], stmt["sql"]) for stmt in load_statements(path)]
+
 
 class DatabaseAnalytics:
     def __init__(self):
-        self.db_params = {
-            "dbname": settings.DB_NAME,
-            "user": settings.DB_USER,
-            "password": settings.DB_PASSWORD,
-            "host": settings.DB_HOST,
-            "port": settings.DB_PORT
-        }
-
-    def execute_query(self, query: str, description: str) -> None:
-        try:
-            with psycopg2.connect(**self.db_params) as conn:
-                with conn.cursor() as cur:
-                    print(f"\n=== {description} ===")
-                    cur.execute(query)
-                    rows = cur.fetchall()
-                    headers = [desc[0] for desc in cur.description]
-                    print(tabulate(rows, headers=headers, tablefmt="grid"))
-        except Exception as e:
-            print(f"Error executing query: {e}")
-
-    def run_analytics(self):
-        with open('sql/queries.sql', 'r') as file:
-            content = file.read().strip()
-
-        # Split queries by semicolon, but keep comments above each query
-        blocks = content.split(';')
-
-        for block in blocks:
-            block = block.strip()
-            if not block:
-                continue
-
-            lines = block.splitlines()
-            # If first line starts with `--`, use it as description
-            if lines[0].startswith('--'):
-                description = lines[0].replace('--', '').strip()
-                query = "\n".join(lines[1:]).strip()
-            else:
-                description = "SQL Query"
-                query = "\n".join(lines).strip()
-
-            if query:  # only run if there's actual SQL
-                self.execute_query(query, description)
+        self.pool = create_pool(settings)
+        self.runner = ScriptRunner(self.pool, settings.SQL_SCRIPT_WORKERS, settings.SQL_STATEMENT_TIMEOUT_MS)
+
+    def print_result(self, result: dict) -> None:
+        print(f"\n=== {result['description']} ===")
+        if result["error"] is not None:
+            print(f"Error executing query: {result['error']}")
+        elif result["rows"] is not None:
+            print(tabulate(result["rows"], headers=result["headers"], tablefmt="grid"))
+        else:
+            print(f"OK ({result['rowcount']} rows affected)")
+
+    def run_analytics(self, path: str = QUERIES_FILE):
+        statements = load_statements(path)
+        started = time.perf_counter()
+        results = self.runner.run(statements, on_result=self.print_result)
+        wall_time = time.perf_counter() - started
+
+        query_time = sum(r["elapsed"] for r in results)
+        failed = sum(1 for r in results if r["error"] is not None)
+        print(f"\n{len(results)} statements ({failed} failed) in {wall_time:.2f}s wall, "
+              f"{query_time:.2f}s summed, {self.runner.max_workers} workers")
+        stats = self.pool.get_stats()
+        print(f"Pool: {stats['checkouts']} checkouts, {stats['created']} connections created, "
+              f"avg wait {stats['wait_time_avg'] * 1000:.2f} ms")
+
+    def close(self):
+        self.pool.close()
 
 
 def main():
     analytics = DatabaseAnalytics()
-    analytics.run_analytics()
+    try:
+        analytics.run_analytics()
+    finally:
+        analytics.close()
 
 if __name__ == "__main__":
     main()
@@ -1,96 +1,81 @@
+import argparse
+
 import pandas as pd
 import psycopg2
-import plotly.graph_objects as go
-from dotenv import load_dotenv
-from pydantic_settings import BaseSettings
-import os
-
-# Загрузка переменных окружения
-load_dotenv()
-
-# Конфигурация подключения
-class Settings(BaseSettings):
-    DB_NAME: str = os.getenv("DB_NAME", "olist")
-    DB_USER: str = os.getenv("DB_USER", "")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
-    DB_HOST: str = os.getenv("DB_HOST", "localhost")
-    DB_PORT: str = os.getenv("DB_PORT", "5432")
-
-    @property
-    def DATABASE_URL(self) -> str:
-        return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
-
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-
-settings = Settings()
+from columnar import copy_frame
+from config import settings
+from query_cache import QueryCache
+import rollups
+import trend_view
 
-# SQL-запрос: Тренд продаж по месяцам
+# SQL-запрос: Тренд продаж по часам (дни, недели и месяцы агрегируются из него)
 query = """
 SELECT 
-    DATE_TRUNC('month', o.order_purchase_timestamp) AS month,
+    DATE_TRUNC('hour', o.order_purchase_timestamp) AS period,
     COUNT(DISTINCT o.order_id) AS total_orders,
     ROUND(SUM(op.payment_value)::numeric, 2) AS total_revenue
 FROM olist_orders o
 JOIN olist_order_payments op ON o.order_id = op.order_id
-GROUP BY month
-ORDER BY month;
+JOIN olist_customers c ON o.customer_id = c.customer_id
+GROUP BY period
+ORDER BY period;
 """
 
-# Получение данных
-conn = psycopg2.connect(settings.DATABASE_URL)
-df = pd.read_sql(query, conn)
-conn.close()
+# Тот же тренд по дням из предагрегированной таблицы (см. rollups.py)
+rollup_query = """
+SELECT 
+    day::timestamp AS period,
+    total_orders,
+    total_revenue
+FROM rollup_daily_sales
+ORDER BY day;
+"""
+
+
+def load_trend(cache: QueryCache = None):
+    """The finest available trend and its resolution: hourly, or daily from the rollup."""
+    # Получение данных (из кэша, если таблицы не менялись)
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    try:
+        sql, finest = query, "hour"
+        if settings.ROLLUPS_ENABLED and "daily_sales" in rollups.fresh_rollups(conn, settings.ROLLUP_MAX_AGE):
+            sql, finest = rollup_query, "day"
+        if cache is not None:
+            df = cache.get_or_compute(conn, sql, lambda: copy_frame(conn, sql))
+        else:
+            df = copy_frame(conn, sql)
+    finally:
+        conn.close()
+
+    # Подготовка данных
+    df['period'] = pd.to_datetime(df['period'])
+    return df, finest
 
-# Подготовка данных
-df['month'] = pd.to_datetime(df['month'])
 
-# Построение графика с range slider
-fig = go.Figure()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive multi-resolution sales trend")
+    parser.add_argument("--output", default=settings.TREND_HTML_PATH, help="self-contained HTML file to write")
+    parser.add_argument("--max-points", type=int, default=settings.TREND_MAX_POINTS,
+                        help="points plotted per series after LTTB downsampling")
+    parser.add_argument("--show", action="store_true", help="also open the figure in a browser")
+    args = parser.parse_args(argv)
 
-# Линия для заказов
-fig.add_trace(go.Scatter(
-    x=df['month'],
-    y=df['total_orders'],
-    mode='lines+markers',
-    name='Заказы'
-))
+    cache = QueryCache.from_settings(settings)
+    df, finest = load_trend(cache)
+    if cache is not None:
+        stats = cache.get_stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+    if df.empty:
+        print("⚠ No orders to plot")
+        return
 
-# Линия для выручки
-fig.add_trace(go.Scatter(
-    x=df['month'],
-    y=df['total_revenue'],
-    mode='lines+markers',
-    name='Выручка (BRL)',
-    yaxis="y2"
-))
+    levels = trend_view.aggregate_levels(df, finest)
+    trend_view.write_html(levels, args.output, args.max_points)
+    print(f"✓ Trend saved to {args.output} "
+          f"({', '.join(f'{name}: {len(level)}' for name, level in levels.items())} points)")
+    if args.show:
+        trend_view.build_figure(levels, args.max_points).show()
 
-# Настройка layout
-fig.update_layout(
-    title="Эволюция продаж по месяцам",
-    xaxis=dict(
-        rangeselector=dict(
-            buttons=list([
-                dict(count=3, label="3m", step="month", stepmode="backward"),
-                dict(count=6, label="6m", step="month", stepmode="backward"),
-                dict(count=1, label="1y", step="year", stepmode="backward"),
-                dict(step="all")
-            ])
-        ),
-        rangeslider=dict(visible=True),
-        type="date"
-    ),
-    yaxis=dict(
-        title="Количество заказов"
-    ),
-    yaxis2=dict(
-        title="Выручка (BRL)",
-        overlaying="y",
-        side="right"
-    ),
-    legend=dict(x=0.01, y=0.99),
-    plot_bgcolor="rgba(245,245,245,1)"
-)
 
-fig.show()
+if __name__ == "__main__":
+    main()
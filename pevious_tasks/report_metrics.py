@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class ReportMetrics:
+    """Timed spans for report stages, exported as Prometheus metrics and/or JSON log lines.
+
+    Stages used by DatabaseAnalytics: ``report`` (whole fetch including
+    cache lookups), ``query`` (execute), ``fetch``, ``render`` (table),
+    ``chart`` (drawing and saving) and ``save`` (PNG write). ``span`` yields
+    a dict; keys added to it inside the block end up in the JSON log line.
+    A report run is usually too short-lived to be scraped, so besides the
+    embedded ``/metrics`` endpoint the registry can be written as a
+    node-exporter textfile or pushed to a Pushgateway at the end of a run.
+    """
+
+    def __init__(self, enabled: bool = True, json_log_path: str = None):
+        self.enabled = enabled
+        self._log_lock = threading.Lock()
+        self._log_file = open(json_log_path, "a", encoding="utf-8") if json_log_path else None
+        if not enabled:
+            return
+
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+        self.registry = CollectorRegistry()
+        self.stage_seconds = Histogram(
+            "shopsight_report_stage_seconds", "Time spent in each report stage",
+            ["report", "stage"], buckets=STAGE_BUCKETS, registry=self.registry,
+        )
+        self.rows = Counter("shopsight_report_rows_total", "Rows returned by report queries",
+                            ["report"], registry=self.registry)
+        self.failures = Counter("shopsight_report_failures_total", "Report stages that raised an error",
+                                ["report", "stage"], registry=self.registry)
+        self.last_success = Gauge("shopsight_report_last_success_timestamp_seconds",
+                                  "Unix time of the last successful report run", ["report"],
+                                  registry=self.registry)
+
+    @classmethod
+    def from_settings(cls, settings):
+        metrics = cls(settings.REPORT_METRICS_ENABLED, settings.REPORT_LOG_JSON or None)
+        if metrics.enabled and settings.REPORT_METRICS_PORT:
+            metrics.serve(settings.REPORT_METRICS_PORT)
+        return metrics
+
+    @contextmanager
+    def span(self, report: str, stage: str, **fields):
+        fields = dict(fields)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield fields
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.observe(report, stage, time.perf_counter() - started, status, **fields)
+
+    def observe(self, report: str, stage: str, seconds: float, status: str = "ok", **fields) -> None:
+        """Record a stage timed elsewhere, e.g. a chart rendered in a worker process."""
+        if self.enabled:
+            self.stage_seconds.labels(report=report, stage=stage).observe(seconds)
+            if status != "ok":
+                self.failures.labels(report=report, stage=stage).inc()
+        self.log(report=report, stage=stage, seconds=round(seconds, 6), status=status, **fields)
+
+    def record_rows(self, report: str, count: int) -> None:
+        if self.enabled:
+            self.rows.labels(report=report).inc(count)
+
+    def record_success(self, report: str) -> None:
+        if self.enabled:
+            self.last_success.labels(report=report).set_to_current_time()
+
+    def log(self, **fields) -> None:
+        if self._log_file is None:
+            return
+        line = json.dumps({"ts": datetime.now(timezone.utc).isoformat(), **fields}, default=str)
+        with self._log_lock:
+            self._log_file.write(line + "\n")
+            self._log_file.flush()
+
+    def serve(self, port: int) -> None:
+        from prometheus_client import start_http_server
+        start_http_server(port, registry=self.registry)
+
+    def export(self, textfile: str = None, pushgateway: str = None, job: str = "shopsight_reports") -> None:
+        if not self.enabled:
+            return
+        if textfile:
+            from prometheus_client import write_to_textfile
+            write_to_textfile(textfile, self.registry)
+        if pushgateway:
+            from prometheus_client import push_to_gateway
+            push_to_gateway(pushgateway, job=job, registry=self.registry)
+
+    def close(self) -> None:
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
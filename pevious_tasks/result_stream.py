@@ -0,0 +1,63 @@
+from collections import deque
+from tabulate import tabulate
+
+
+def iter_chunks(cur, chunk_size: int):
+    """Yield lists of rows from a cursor, ``chunk_size`` rows at a time."""
+    while True:
+        chunk = cur.fetchmany(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class RowPreview:
+    """Keeps the first and last ``preview_rows`` rows of a stream and counts the rest."""
+
+    def __init__(self, preview_rows: int):
+        self.preview_rows = preview_rows
+        self.head = []
+        self.tail = deque(maxlen=preview_rows or None)
+        self.row_count = 0
+
+    def add(self, chunk) -> None:
+        self.row_count += len(chunk)
+        if not self.preview_rows:
+            # Preview disabled: keep everything.
+            self.head.extend(chunk)
+            return
+        missing = self.preview_rows - len(self.head)
+        if missing > 0:
+            self.head.extend(chunk[:missing])
+            chunk = chunk[missing:]
+        self.tail.extend(chunk)
+
+    @property
+    def truncated(self) -> bool:
+        return self.row_count > len(self.head) + len(self.tail)
+
+    def rows(self) -> list:
+        return self.head + list(self.tail)
+
+    def render(self, headers) -> str:
+        rows = self.head
+        if self.tail:
+            if self.truncated:
+                rows = rows + [["..."] * len(headers)]
+            rows = rows + list(self.tail)
+        return tabulate(rows, headers=headers, tablefmt="grid")
+
+
+class ColumnCollector:
+    """Accumulates the first ``n_columns`` columns of a stream for charting."""
+
+    def __init__(self, n_columns: int = 2):
+        self.columns = [[] for _ in range(n_columns)]
+
+    def add(self, chunk) -> None:
+        if not chunk:
+            return
+        width = min(len(self.columns), len(chunk[0]))
+        transposed = list(zip(*chunk))
+        for i in range(width):
+            self.columns[i].extend(transposed[i])
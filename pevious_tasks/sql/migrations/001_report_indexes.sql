@@ -0,0 +1,16 @@
+-- Join keys used by the analytics reports, rollups and KPI exporter
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_customer_id ON olist_orders (customer_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_order_id ON olist_order_items (order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_seller_id ON olist_order_items (seller_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_product_id ON olist_order_items (product_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_payments_order_id ON olist_order_payments (order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_reviews_order_id ON olist_order_reviews (order_id);
+
+-- Time filters and keyset watermarks (rollups.py, kpi_exporter.py)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_purchase_ts ON olist_orders (order_purchase_timestamp, order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_reviews_created ON olist_order_reviews (review_creation_date, review_id);
+
+ANALYZE olist_orders;
+ANALYZE olist_order_items;
+ANALYZE olist_order_payments;
+ANALYZE olist_order_reviews;
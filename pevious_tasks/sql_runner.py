@@ -0,0 +1,279 @@
+"""Parse and run a .sql script of ``--``-described statements.
+
+The splitter understands quoted strings (including E'' escapes), quoted
+identifiers, dollar-quoted bodies and nested block comments, so ``;``
+inside any of them does not end a statement. The first ``--`` line above a
+statement is its description, as before. Directive comments tune scheduling:
+
+    -- @barrier       run alone: after everything above, before everything below
+    -- @parallel      let a write (e.g. an independent CREATE INDEX) run concurrently
+    -- @timeout 5000  statement_timeout for this statement, in milliseconds
+
+Read-only statements (SELECT/WITH/VALUES/TABLE/SHOW/EXPLAIN without
+data-modifying keywords) run concurrently in READ ONLY transactions; any
+other statement is a barrier unless marked ``@parallel``.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+READ_ONLY_KEYWORDS = {"select", "with", "values", "table", "show", "explain"}
+WRITE_PATTERN = re.compile(r"\b(insert|update|delete|merge|into|analyze|analyse)\b", re.IGNORECASE)
+# Statements that refuse to run inside a transaction block.
+AUTOCOMMIT_PATTERN = re.compile(r"\bconcurrently\b|^\s*(vacuum|create\s+database|drop\s+database)\b",
+                                re.IGNORECASE)
+DOLLAR_TAG = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+
+def _is_ident_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _skip_quoted(text: str, i: int, quote: str, backslash_escapes: bool = False) -> int:
+    """Return the index just past the quoted token starting at ``text[i]``."""
+    i += 1
+    while i < len(text):
+        ch = text[i]
+        if backslash_escapes and ch == "\\":
+            i += 2
+            continue
+        if ch == quote:
+            if text.startswith(quote * 2, i):
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_block_comment(text: str, i: int) -> int:
+    depth = 0
+    while i < len(text):
+        if text.startswith("/*", i):
+            depth += 1
+            i += 2
+        elif text.startswith("*/", i):
+            depth -= 1
+            i += 2
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    return i
+
+
+def split_sql(text: str) -> list:
+    """Split a script into statement dicts (index, description, sql, hints, read_only, autocommit, hint_error).
+
+    ``hint_error`` describes an invalid directive (e.g. ``@timeout`` without a
+    number); ``ScriptRunner`` reports it as that statement's error.
+    """
+    statements = []
+    comments = []
+    code_start = None
+    i, n = 0, len(text)
+
+    def emit(end):
+        if code_start is not None:
+            statements.append(_make_statement(len(statements), text[code_start:end].strip(), comments))
+
+    while i < n:
+        ch = text[i]
+        if text.startswith("--", i):
+            end = text.find("\n", i)
+            end = n if end == -1 else end
+            if code_start is None:
+                comments.append(text[i + 2:end].strip())
+            i = end
+            continue
+        if text.startswith("/*", i):
+            i = _skip_block_comment(text, i)
+            continue
+        if ch == ";":
+            emit(i)
+            comments, code_start = [], None
+            i += 1
+            continue
+        if ch.isspace():
+            i += 1
+            continue
+
+        if code_start is None:
+            code_start = i
+        if ch == "'":
+            escapes = i > 0 and text[i - 1] in "eE" and (i < 2 or not _is_ident_char(text[i - 2]))
+            i = _skip_quoted(text, i, "'", backslash_escapes=escapes)
+        elif ch == '"':
+            i = _skip_quoted(text, i, '"')
+        elif ch == "$" and (i == 0 or not _is_ident_char(text[i - 1])) and DOLLAR_TAG.match(text, i):
+            tag = DOLLAR_TAG.match(text, i).group(0)
+            end = text.find(tag, i + len(tag))
+            i = n if end == -1 else end + len(tag)
+        else:
+            i += 1
+    emit(n)
+    return statements
+
+
+def _make_statement(index: int, sql: str, comments: list) -> dict:
+    hints = {}
+    description = None
+    for comment in comments:
+        if comment.startswith("@"):
+            name, _, value = comment[1:].partition(" ")
+            hints[name.strip().lower()] = value.strip() or True
+        elif description is None and comment:
+            description = comment
+
+    hint_error = None
+    if "timeout" in hints:
+        value = hints["timeout"]
+        if value is True or not value.isdigit():
+            shown = "no value" if value is True else repr(value)
+            hint_error = f"@timeout needs a whole number of milliseconds, got {shown}"
+            del hints["timeout"]
+        else:
+            hints["timeout"] = int(value)
+
+    first_word = sql.split(None, 1)[0].lower() if sql else ""
+    read_only = first_word in READ_ONLY_KEYWORDS and not WRITE_PATTERN.search(sql)
+    return {
+        "index": index,
+        "description": description or "SQL Query",
+        "sql": sql,
+        "hints": hints,
+        "read_only": read_only and "barrier" not in hints,
+        "autocommit": bool(AUTOCOMMIT_PATTERN.search(sql)),
+        "hint_error": hint_error,
+    }
+
+
+def plan_stages(statements: list) -> list:
+    """Group statements into stages; statements within a stage may run concurrently."""
+    stages, current = [], []
+    for stmt in statements:
+        concurrent = (stmt["read_only"] or "parallel" in stmt["hints"]) and "barrier" not in stmt["hints"]
+        if concurrent:
+            current.append(stmt)
+            continue
+        if current:
+            stages.append(current)
+            current = []
+        stages.append([stmt])
+    if current:
+        stages.append(current)
+    return stages
+
+
+class ScriptRunner:
+    """Runs parsed statements stage by stage over a ``ConnectionPool``.
+
+    ``on_result`` is called on the calling thread, in script order, with one
+    result dict per statement (description, headers, rows, rowcount, error,
+    elapsed). ``cancel()`` sends ``pg_cancel_backend`` for every statement
+    still running; it is also called on Ctrl+C.
+    """
+
+    def __init__(self, pool, max_workers: int = 4, statement_timeout_ms: int = 0):
+        self.pool = pool
+        self.max_workers = max(1, min(max_workers, pool.max_size))
+        self.statement_timeout_ms = statement_timeout_ms
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def run(self, statements: list, on_result=None) -> list:
+        results = []
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for stage in plan_stages(statements):
+                # Even single statements go through the executor so this
+                # thread stays free to handle Ctrl+C and cancel them.
+                futures = [executor.submit(self.execute, stmt) for stmt in stage]
+                for future in futures:
+                    result = future.result()
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(result)
+        except KeyboardInterrupt:
+            self.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def execute(self, stmt: dict) -> dict:
+        result = {"index": stmt["index"], "description": stmt["description"], "headers": [],
+                  "rows": None, "rowcount": -1, "error": None, "elapsed": 0.0}
+        started = time.perf_counter()
+        try:
+            if stmt.get("hint_error"):
+                raise ValueError(stmt["hint_error"])
+            timeout = int(stmt["hints"].get("timeout", self.statement_timeout_ms) or 0)
+            with self.pool.connection() as conn:
+                with self._lock:
+                    self._running[stmt["index"]] = conn.get_backend_pid()
+                try:
+                    if stmt["autocommit"]:
+                        self._execute_autocommit(conn, stmt, timeout, result)
+                    else:
+                        self._execute_in_transaction(conn, stmt, timeout, result)
+                finally:
+                    with self._lock:
+                        self._running.pop(stmt["index"], None)
+        except Exception as e:
+            result["error"] = e
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    def _execute_in_transaction(self, conn, stmt, timeout, result):
+        with conn.cursor() as cur:
+            if stmt["read_only"]:
+                cur.execute("SET TRANSACTION READ ONLY")
+            if timeout:
+                cur.execute("SET LOCAL statement_timeout = %s", (timeout,))
+            cur.execute(stmt["sql"])
+            self._read(cur, result)
+
+    def _execute_autocommit(self, conn, stmt, timeout, result):
+        conn.commit()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                if timeout:
+                    cur.execute("SET statement_timeout = %s", (timeout,))
+                try:
+                    cur.execute(stmt["sql"])
+                    self._read(cur, result)
+                finally:
+                    if timeout:
+                        cur.execute("RESET statement_timeout")
+        finally:
+            conn.autocommit = False
+
+    @staticmethod
+    def _read(cur, result):
+        result["rowcount"] = cur.rowcount
+        if cur.description:
+            result["headers"] = [desc[0] for desc in cur.description]
+            result["rows"] = cur.fetchall()
+
+    def cancel(self) -> int:
+        """Cancel all running statements; returns how many backends were signalled."""
+        with self._lock:
+            pids = list(self._running.values())
+        if not pids:
+            return 0
+        # A separate connection: the pool may be fully checked out by the
+        # very statements being cancelled.
+        import psycopg2
+
+        conn = psycopg2.connect(**self.pool.db_params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for pid in pids:
+                    cur.execute("SELECT pg_cancel_backend(%s)", (pid,))
+        finally:
+            conn.close()
+        return len(pids)
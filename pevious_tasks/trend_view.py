@@ -0,0 +1,240 @@
+"""Multi-resolution sales trend rendered with WebGL (plotly Scattergl).
+
+The hourly series is aggregated once into hour/day/week/month levels. The
+exported HTML embeds every level as a JSON string that is only parsed when
+it is needed: on each range slider move the page picks the finest level
+with at most ``LEVEL_OVERSAMPLE * max_points`` points in the visible window,
+slices that window and reduces it to ``max_points`` with LTTB
+(Largest-Triangle-Three-Buckets), so the browser never plots more than a
+few thousand points however long the history is.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+SERIES = (
+    ("total_orders", "Заказы", "y"),
+    ("total_revenue", "Выручка (BRL)", "y2"),
+)
+
+# Finest first; the functions map hourly period starts to the level's bucket.
+RESOLUTIONS = (
+    ("hour", lambda s: s),
+    ("day", lambda s: s.dt.floor("D")),
+    ("week", lambda s: s.dt.to_period("W").dt.start_time),
+    ("month", lambda s: s.dt.to_period("M").dt.start_time),
+)
+
+# A level is used while the window holds at most this many times max_points.
+LEVEL_OVERSAMPLE = 4
+
+
+def aggregate_levels(df: pd.DataFrame, finest: str = "hour") -> dict:
+    """{level: DataFrame(period, total_orders, total_revenue)} from ``finest`` up to month.
+
+    ``df`` has one row per ``finest`` period; orders belong to exactly one
+    period, so summing distinct order counts stays exact.
+    """
+    names = [name for name, _ in RESOLUTIONS]
+    levels = {}
+    for name, bucket in RESOLUTIONS[names.index(finest):]:
+        grouped = df.groupby(bucket(df["period"]).rename("period"), sort=True)[["total_orders", "total_revenue"]].sum()
+        levels[name] = grouped.reset_index()
+    return levels
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the ``n_out`` points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point
+    and the mean of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def _epoch_ms(periods: pd.Series) -> np.ndarray:
+    return pd.to_datetime(periods).values.astype("datetime64[ms]").astype(np.int64)
+
+
+def pick_level(levels: dict, max_points: int) -> str:
+    """Finest level whose full range fits the point budget (the initial view)."""
+    for name in levels:
+        if len(levels[name]) <= LEVEL_OVERSAMPLE * max_points:
+            return name
+    return list(levels)[-1]
+
+
+def build_figure(levels: dict, max_points: int = 1500) -> go.Figure:
+    level = pick_level(levels, max_points)
+    df = levels[level]
+    x = _epoch_ms(df["period"])
+    fig = go.Figure()
+    for column, label, axis in SERIES:
+        kept = lttb(x, df[column].to_numpy(), max_points)
+        fig.add_trace(go.Scattergl(
+            x=pd.to_datetime(x[kept], unit="ms"),
+            y=df[column].to_numpy()[kept],
+            mode="lines",
+            name=label,
+            yaxis=axis,
+        ))
+
+    # The page restyles traces to the visible window; the slider keeps the full range.
+    full_range = [pd.to_datetime(x[0], unit="ms"), pd.to_datetime(x[-1], unit="ms")]
+    fig.update_layout(
+        title=f"Эволюция продаж ({level})",
+        xaxis=dict(
+            rangeselector=dict(
+                buttons=list([
+                    dict(count=7, label="1w", step="day", stepmode="backward"),
+                    dict(count=1, label="1m", step="month", stepmode="backward"),
+                    dict(count=3, label="3m", step="month", stepmode="backward"),
+                    dict(count=6, label="6m", step="month", stepmode="backward"),
+                    dict(count=1, label="1y", step="year", stepmode="backward"),
+                    dict(step="all")
+                ])
+            ),
+            rangeslider=dict(visible=True, autorange=False, range=full_range),
+            range=full_range,
+            type="date"
+        ),
+        yaxis=dict(
+            title="Количество заказов"
+        ),
+        yaxis2=dict(
+            title="Выручка (BRL)",
+            overlaying="y",
+            side="right"
+        ),
+        legend=dict(x=0.01, y=0.99),
+        plot_bgcolor="rgba(245,245,245,1)"
+    )
+    return fig
+
+
+_RELAYOUT_JS = """
+(function () {
+  var gd = document.getElementById('{plot_id}');
+  var raw = %(levels)s;
+  var order = %(order)s;
+  var meta = %(meta)s;
+  var series = %(series)s;
+  var maxPoints = %(max_points)d;
+  var oversample = %(oversample)d;
+  var parsed = {};
+
+  function level(name) {
+    if (!(name in parsed)) { parsed[name] = JSON.parse(raw[name]); }
+    return parsed[name];
+  }
+  function toMs(v) {
+    if (typeof v === 'number') { return v; }
+    return Date.parse(String(v).replace(' ', 'T') + (/[zZ]|[+-]\\d\\d:?\\d\\d$/.test(v) ? '' : 'Z'));
+  }
+  function lowerBound(xs, v) {
+    var lo = 0, hi = xs.length;
+    while (lo < hi) { var mid = (lo + hi) >> 1; if (xs[mid] < v) { lo = mid + 1; } else { hi = mid; } }
+    return lo;
+  }
+  function lttb(xs, ys, n) {
+    var len = xs.length;
+    if (n >= len || n < 3) { return {x: xs, y: ys}; }
+    var outX = [xs[0]], outY = [ys[0]], every = (len - 2) / (n - 2), a = 0;
+    for (var i = 0; i < n - 2; i++) {
+      var start = Math.floor(i * every) + 1, end = Math.floor((i + 1) * every) + 1;
+      var nextEnd = Math.min(Math.floor((i + 2) * every) + 1, len);
+      var avgX = 0, avgY = 0, count = nextEnd - end;
+      for (var j = end; j < nextEnd; j++) { avgX += xs[j]; avgY += ys[j]; }
+      avgX /= count; avgY /= count;
+      var best = start, bestArea = -1;
+      for (var k = start; k < end; k++) {
+        var area = Math.abs((xs[a] - avgX) * (ys[k] - ys[a]) - (xs[a] - xs[k]) * (avgY - ys[a]));
+        if (area > bestArea) { bestArea = area; best = k; }
+      }
+      outX.push(xs[best]); outY.push(ys[best]); a = best;
+    }
+    outX.push(xs[len - 1]); outY.push(ys[len - 1]);
+    return {x: outX, y: outY};
+  }
+  function pick(lo, hi) {
+    // Estimated from each level's size and span, so only the chosen level is parsed.
+    for (var i = 0; i < order.length; i++) {
+      var m = meta[order[i]];
+      var span = Math.max(m.last - m.first, 1);
+      if (m.count * Math.min((hi - lo) / span, 1) <= oversample * maxPoints) { return order[i]; }
+    }
+    return order[order.length - 1];
+  }
+  function update(lo, hi) {
+    var data = level(pick(lo, hi));
+    var from = Math.max(lowerBound(data.x, lo) - 1, 0);
+    var to = Math.min(lowerBound(data.x, hi) + 1, data.x.length);
+    var xs = [], ys = [];
+    for (var s = 0; s < series.length; s++) {
+      var r = lttb(data.x.slice(from, to), data[series[s]].slice(from, to), maxPoints);
+      xs.push(r.x); ys.push(r.y);
+    }
+    Plotly.restyle(gd, {x: xs, y: ys});
+  }
+
+  gd.on('plotly_relayout', function (ev) {
+    var lo, hi;
+    if (ev['xaxis.range[0]'] !== undefined) {
+      lo = toMs(ev['xaxis.range[0]']); hi = toMs(ev['xaxis.range[1]']);
+    } else if (ev['xaxis.range'] !== undefined) {
+      lo = toMs(ev['xaxis.range'][0]); hi = toMs(ev['xaxis.range'][1]);
+    } else if (ev['xaxis.autorange']) {
+      lo = meta[order[0]].first; hi = meta[order[0]].last;
+    } else {
+      return;
+    }
+    update(lo, hi);
+  });
+})();
+"""
+
+
+def write_html(levels: dict, path: str, max_points: int = 1500) -> str:
+    """Write a self-contained HTML trend (plotly.js inlined) to ``path``."""
+    raw, meta = {}, {}
+    for name, df in levels.items():
+        x = _epoch_ms(df["period"])
+        meta[name] = {"count": len(x), "first": int(x[0]), "last": int(x[-1])}
+        payload = {"x": x.tolist()}
+        for column, _, _ in SERIES:
+            payload[column] = df[column].astype(float).round(2).tolist()
+        # Stored as a string so the browser only parses levels it uses.
+        raw[name] = json.dumps(payload, separators=(",", ":"))
+
+    script = _RELAYOUT_JS % {
+        "levels": json.dumps(raw),
+        "order": json.dumps(list(levels)),
+        "meta": json.dumps(meta),
+        "series": json.dumps([column for column, _, _ in SERIES]),
+        "max_points": max_points,
+        "oversample": LEVEL_OVERSAMPLE,
+    }
+    build_figure(levels, max_points).write_html(path, include_plotlyjs=True, full_html=True,
+                                                post_script=script)
+    return path
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+
+_TABLE_RE = re.compile(r"\b(?:from|join)\s+([a-zA-Z_][\w.]*)", re.IGNORECASE)
+_CTE_RE = re.compile(r"\b([a-zA-Z_]\w*)\s+as\s*\(", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace and drop the trailing semicolon so formatting does not change the key."""
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def source_tables(query: str) -> list:
+    """Best-effort list of the tables a query reads (FROM/JOIN targets that are not CTEs)."""
+    ctes = {name.lower() for name in _CTE_RE.findall(query)}
+    tables = set()
+    for name in _TABLE_RE.findall(query):
+        relname = name.split(".")[-1].lower()
+        if relname not in ctes:
+            tables.add(relname)
+    return sorted(tables)
+
+
+class QueryCache:
+    """On-disk cache of query results.
+
+    Entries are keyed on the normalized SQL text plus parameters. An entry is
+    served while it is younger than ``ttl`` seconds and the write counters in
+    ``pg_stat_user_tables`` for its source tables have not moved since it was
+    stored.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 300.0, max_rows: int = 100000):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_rows = max_rows
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "stores": 0, "skipped": 0}
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.QUERY_CACHE_ENABLED:
+            return None
+        return cls(settings.QUERY_CACHE_DIR, ttl=settings.QUERY_CACHE_TTL,
+                   max_rows=settings.QUERY_CACHE_MAX_ROWS)
+
+    def key(self, query: str, params=None) -> str:
+        raw = normalize_sql(query) + "\x00" + repr(params)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def table_fingerprint(self, conn, tables) -> tuple:
+        if not tables:
+            return ()
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT relname, n_tup_ins, n_tup_upd, n_tup_del
+                FROM pg_stat_user_tables
+                WHERE relname = ANY(%s)
+                ORDER BY relname
+            """, (list(tables),))
+            return tuple(cur.fetchall())
+
+    def get(self, conn, query: str, params=None):
+        """Return ``(True, value)`` on a valid hit, ``(False, fingerprint)`` otherwise.
+
+        The fingerprint returned on a miss should be passed to ``put`` so that
+        writes that happen while the query runs invalidate the new entry.
+        """
+        path = self._path(self.key(query, params))
+        fingerprint = self.table_fingerprint(conn, source_tables(query))
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            self._count("misses")
+            return False, fingerprint
+
+        if time.time() - entry["stored_at"] > self.ttl:
+            self._count("expired")
+            self._count("misses")
+            self._remove(path)
+            return False, fingerprint
+        if entry["fingerprint"] != fingerprint:
+            self._count("invalidated")
+            self._count("misses")
+            self._remove(path)
+            return False, fingerprint
+
+        self._count("hits")
+        return True, entry["value"]
+
+    def put(self, query: str, value, fingerprint, params=None, row_count: int = None) -> None:
+        if row_count is not None and row_count > self.max_rows:
+            self._count("skipped")
+            return
+        path = self._path(self.key(query, params))
+        entry = {"stored_at": time.time(), "fingerprint": fingerprint, "value": value}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._count("stores")
+
+    def get_or_compute(self, conn, query: str, compute, params=None):
+        hit, value = self.get(conn, query, params)
+        if hit:
+            return value
+        fingerprint = value
+        value = compute()
+        self.put(query, value, fingerprint, params)
+        return value
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,54 @@
+import json
+import os
+import re
+from datetime import datetime
+
+
+def explain_analyze(conn, query: str, params=None) -> dict:
+    """Run EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and return the plan document.
+
+    The statement really executes, so it is always rolled back afterwards.
+    """
+    sql = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query.strip().rstrip(";")
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            plan = cur.fetchone()[0]
+    finally:
+        conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def summarize_plan(plan: dict) -> dict:
+    root = plan["Plan"]
+    return {
+        "execution_ms": plan.get("Execution Time"),
+        "planning_ms": plan.get("Planning Time"),
+        "node": root.get("Node Type"),
+        "rows": root.get("Actual Rows"),
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+        "temp_written_blocks": root.get("Temp Written Blocks", 0),
+    }
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def record_plan(plans_dir: str, description: str, query: str, plan: dict, recorded_at: datetime = None) -> dict:
+    """Save the full plan under ``plans_dir/<timestamp>/`` and append its summary to history.jsonl."""
+    recorded_at = recorded_at or datetime.now()
+    stamp = recorded_at.strftime("%Y%m%dT%H%M%S")
+    run_dir = os.path.join(plans_dir, stamp)
+    os.makedirs(run_dir, exist_ok=True)
+
+    summary = summarize_plan(plan)
+    with open(os.path.join(run_dir, f"{slugify(description)}.json"), "w", encoding="utf-8") as f:
+        json.dump({"description": description, "query": query, "recorded_at": recorded_at.isoformat(),
+                   "summary": summary, "plan": plan}, f, indent=2, default=str)
+    with open(os.path.join(plans_dir, "history.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"recorded_at": recorded_at.isoformat(), "description": description, **summary}) + "\n")
+    return summary
@@ -0,0 +1,245 @@
+"""Pre-aggregated daily sales rollups with incremental refresh.
+
+Each rollup keeps a high-water mark on ``olist_orders.order_purchase_timestamp``.
+A refresh recomputes only the days from the watermark's day onwards (the
+boundary day is rebuilt completely, so nothing is counted twice).
+
+Each refresh also stores the write counters of the rollup's source tables
+(``pg_stat_user_tables``) and the number of orders before the watermark's
+day. A rollup counts as fresh only while those write counters have not
+moved, so reports fall back to the base tables after any write. The next
+refresh rebuilds from scratch when source rows were updated or deleted
+(a recategorised product included), when orders older than the watermark
+appeared (back-dated inserts such as workload_generator.py's), or when the
+rollup's INSERT changed. Items or payments inserted later for existing old
+orders are still not detected; run with ``--full`` to rebuild from scratch.
+
+    python rollups.py          # incremental refresh
+    python rollups.py --full   # rebuild everything
+"""
+import hashlib
+import sys
+import time
+
+import psycopg2
+
+from config import settings
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollup_watermarks (
+        rollup_name text PRIMARY KEY,
+        high_water timestamp,
+        refreshed_at timestamptz NOT NULL DEFAULT now()
+    );
+    ALTER TABLE rollup_watermarks ADD COLUMN IF NOT EXISTS source_writes bigint;
+    ALTER TABLE rollup_watermarks ADD COLUMN IF NOT EXISTS source_changes bigint;
+    ALTER TABLE rollup_watermarks ADD COLUMN IF NOT EXISTS orders_before bigint;
+    ALTER TABLE rollup_watermarks ADD COLUMN IF NOT EXISTS definition text;
+
+    CREATE TABLE IF NOT EXISTS rollup_daily_sales (
+        day date PRIMARY KEY,
+        total_orders integer NOT NULL,
+        total_revenue numeric(14, 2) NOT NULL
+    );
+
+    -- Uncategorised products are stored as '' so the category can be part of the key.
+    CREATE TABLE IF NOT EXISTS rollup_daily_category_sales (
+        day date NOT NULL,
+        product_category_name text NOT NULL,
+        total_sales integer NOT NULL,
+        total_revenue numeric(14, 2) NOT NULL,
+        PRIMARY KEY (day, product_category_name)
+    );
+
+    CREATE OR REPLACE VIEW rollup_monthly_sales AS
+    SELECT
+        DATE_TRUNC('month', day::timestamp) AS month,
+        SUM(total_orders) AS total_orders,
+        SUM(total_revenue) AS total_revenue
+    FROM rollup_daily_sales
+    GROUP BY 1;
+"""
+
+ROLLUPS = {
+    "daily_sales": {
+        "table": "rollup_daily_sales",
+        # Orders without a customer row are left out, as in the reports.
+        "sources": ("olist_orders", "olist_order_payments", "olist_customers"),
+        "insert": """
+            INSERT INTO rollup_daily_sales (day, total_orders, total_revenue)
+            SELECT
+                DATE_TRUNC('day', o.order_purchase_timestamp)::date AS day,
+                COUNT(DISTINCT o.order_id),
+                COALESCE(SUM(op.payment_value), 0)
+            FROM olist_orders o
+            JOIN olist_order_payments op ON o.order_id = op.order_id
+            JOIN olist_customers c ON o.customer_id = c.customer_id
+            WHERE o.order_purchase_timestamp >= %(since)s
+              AND o.order_purchase_timestamp <= %(until)s
+            GROUP BY 1
+        """,
+    },
+    "daily_category_sales": {
+        "table": "rollup_daily_category_sales",
+        "sources": ("olist_orders", "olist_order_items", "olist_products"),
+        "insert": """
+            INSERT INTO rollup_daily_category_sales (day, product_category_name, total_sales, total_revenue)
+            SELECT
+                DATE_TRUNC('day', o.order_purchase_timestamp)::date AS day,
+                COALESCE(p.product_category_name, ''),
+                COUNT(*),
+                COALESCE(SUM(oi.price), 0)
+            FROM olist_order_items oi
+            JOIN olist_orders o ON oi.order_id = o.order_id
+            JOIN olist_products p ON oi.product_id = p.product_id
+            WHERE o.order_purchase_timestamp >= %(since)s
+              AND o.order_purchase_timestamp <= %(until)s
+            GROUP BY 1, 2
+        """,
+    },
+}
+
+
+def ensure_schema(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA)
+    conn.commit()
+
+
+SOURCE_TABLES = sorted({table for rollup in ROLLUPS.values() for table in rollup["sources"]})
+
+
+def source_writes(conn) -> dict:
+    """{table: (inserted, updated + deleted)} cumulative row counters of the source tables."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT relname, n_tup_ins, n_tup_upd + n_tup_del
+            FROM pg_stat_user_tables
+            WHERE relname = ANY(%s)
+        """, (SOURCE_TABLES,))
+        return {name: (inserted, changed) for name, inserted, changed in cur.fetchall()}
+
+
+def _rollup_writes(writes: dict, rollup: dict) -> tuple:
+    """(all writes, updates + deletes) to one rollup's source tables."""
+    inserted = sum(writes.get(table, (0, 0))[0] for table in rollup["sources"])
+    changed = sum(writes.get(table, (0, 0))[1] for table in rollup["sources"])
+    return inserted + changed, changed
+
+
+def _orders_before(cur, day) -> int:
+    cur.execute("SELECT COUNT(*) FROM olist_orders WHERE order_purchase_timestamp < %s::date", (day,))
+    return cur.fetchone()[0]
+
+
+def _definition(rollup: dict) -> str:
+    """Hash of the rollup's INSERT, so editing it forces a full rebuild."""
+    return hashlib.sha256(" ".join(rollup["insert"].split()).encode("utf-8")).hexdigest()[:16]
+
+
+def _day(timestamp):
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def refresh(conn, full: bool = False) -> list:
+    """Bring every rollup up to the newest order; returns one stats dict per rollup."""
+    ensure_schema(conn)
+    results = []
+    # Counters are read first, so writes racing with the refresh leave it stale.
+    writes = source_writes(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(order_purchase_timestamp) FROM olist_orders")
+        until = cur.fetchone()[0]
+
+    for name, rollup in ROLLUPS.items():
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT high_water, source_changes, orders_before, definition
+                FROM rollup_watermarks
+                WHERE rollup_name = %s
+                FOR UPDATE
+            """, (name,))
+            row = cur.fetchone()
+            high_water = None if full or row is None else row[0]
+            total_writes, changed = _rollup_writes(writes, rollup)
+            reason = "requested" if full else None
+
+            if high_water is not None and row[3] != _definition(rollup):
+                high_water, reason = None, "rollup definition changed"
+            elif high_water is not None and row[1] != changed:
+                high_water, reason = None, "source rows updated or deleted"
+            elif high_water is not None and _orders_before(cur, _day(high_water)) != row[2]:
+                high_water, reason = None, "orders older than the watermark changed"
+
+            orders_before = None
+            if until is None:
+                rows_written = 0
+            elif high_water is None:
+                orders_before = _orders_before(cur, _day(until))
+                cur.execute(f"TRUNCATE {rollup['table']}")
+                cur.execute(rollup["insert"], {"since": "-infinity", "until": until})
+                rows_written = cur.rowcount
+            else:
+                # Rebuild from the start of the watermark's day.
+                since = _day(high_water)
+                orders_before = _orders_before(cur, _day(until))
+                cur.execute(f"DELETE FROM {rollup['table']} WHERE day >= %s::date", (since,))
+                cur.execute(rollup["insert"], {"since": since, "until": until})
+                rows_written = cur.rowcount
+
+            cur.execute("""
+                INSERT INTO rollup_watermarks
+                    (rollup_name, high_water, refreshed_at, source_writes, source_changes, orders_before,
+                     definition)
+                VALUES (%s, %s, now(), %s, %s, %s, %s)
+                ON CONFLICT (rollup_name)
+                DO UPDATE SET high_water = EXCLUDED.high_water, refreshed_at = EXCLUDED.refreshed_at,
+                              source_writes = EXCLUDED.source_writes, source_changes = EXCLUDED.source_changes,
+                              orders_before = EXCLUDED.orders_before, definition = EXCLUDED.definition
+            """, (name, until if until is not None else high_water, total_writes, changed, orders_before,
+                  _definition(rollup)))
+        conn.commit()
+        results.append({
+            "rollup": name,
+            "mode": "full" if high_water is None else "incremental",
+            "reason": reason,
+            "from": high_water,
+            "to": until,
+            "rows_written": rows_written,
+            "seconds": time.perf_counter() - started,
+        })
+    return results
+
+
+def fresh_rollups(conn, max_age: float) -> set:
+    """Names of rollups refreshed within the last ``max_age`` seconds with no source writes since."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('rollup_watermarks')")
+        if cur.fetchone()[0] is None:
+            return set()
+        cur.execute("""
+            SELECT rollup_name, source_writes
+            FROM rollup_watermarks
+            WHERE refreshed_at >= now() - make_interval(secs => %s)
+        """, (max_age,))
+        recent = cur.fetchall()
+    writes = source_writes(conn)
+    return {name for name, stored in recent
+            if name in ROLLUPS and stored == _rollup_writes(writes, ROLLUPS[name])[0]}
+
+
+def main():
+    full = "--full" in sys.argv[1:]
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    try:
+        for stats in refresh(conn, full=full):
+            reason = f" ({stats['reason']})" if stats["reason"] else ""
+            print(f"{stats['rollup']}: {stats['mode']} refresh{reason}, {stats['rows_written']} rows "
+                  f"written in {stats['seconds']:.2f}s (up to {stats['to']})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Single entry point for the ShopSight scripts.
+
+    python shopsight.py reports [--explain]
+    python shopsight.py trend [queries.py options]
+    python shopsight.py ingest [autoInsert.py options]
+    python shopsight.py exporter [--kind weather|kpi]
+    python shopsight.py mesh [mesh_pipeline.py options]
+
+Only the standard library is imported up front: each subcommand imports its
+own module (and with it pandas, matplotlib, open3d, ...) when it runs, so a
+cron job calling ``ingest`` never pays for plotting libraries. Settings are
+built once by ``config.get_settings()`` and shared by every module.
+
+``--profile-startup`` prints, on stderr, how long the settings and the
+subcommand's imports took, with each package's own import time (its
+submodules included, other packages it imports excluded).
+"""
+import argparse
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PREVIOUS_TASKS = os.path.join(ROOT, "pevious_tasks")
+
+
+class ImportProfiler:
+    """Time first-time imports by wrapping ``builtins.__import__``.
+
+    Each import is billed its self time (its duration minus the imports it
+    triggered), under its top-level package, like ``python -X importtime``.
+    Relative imports are not intercepted and count towards the importer.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.phases = []
+        self._children = []  # time spent in nested imports, one slot per open import
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            package = name.partition(".")[0]
+            self.timings[package] = self.timings.get(package, 0.0) + elapsed - nested
+
+    def start(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self, top: int = 15, stream=None):
+        stream = stream or sys.stderr
+        print("Startup profile:", file=stream)
+        for name, seconds in self.phases:
+            print(f"  {name:<28} {seconds * 1000:9.1f} ms", file=stream)
+        print("  imports by package:", file=stream)
+        ranked = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+        for package, seconds in ranked[:top]:
+            print(f"    {package:<26} {seconds * 1000:9.1f} ms", file=stream)
+        print(f"  {len(self.timings)} packages, {sum(self.timings.values()) * 1000:.1f} ms total", file=stream)
+
+
+def _settings():
+    from config import get_settings
+
+    return get_settings()
+
+
+# Each loader imports its module and returns the call that runs the command,
+# so the import can be timed separately from the (possibly endless) run.
+
+def load_reports(args):
+    import analytics
+    return lambda: analytics.main(["--explain"] if args.explain else [])
+
+
+def load_trend(args):
+    import queries
+    return lambda: queries.main(args.args)
+
+
+def load_ingest(args):
+    import autoInsert
+    return lambda: autoInsert.main(args.args)
+
+
+def load_exporter(args):
+    if args.kind == "kpi":
+        import kpi_exporter as exporter
+    else:
+        import custom_exporter as exporter
+    return exporter.main
+
+
+def load_mesh(args):
+    import mesh_pipeline
+    return lambda: mesh_pipeline.main(args.args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="shopsight", description="ShopSight analytics tools")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report settings and import time on stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reports = commands.add_parser("reports", help="run the analytics reports and charts")
+    reports.add_argument("--explain", action="store_true", help="show query plans instead of running reports")
+    reports.set_defaults(load=load_reports, needs_settings=True, forward=False)
+
+    # Forwarding subcommands take no options of their own (-h included), so
+    # everything after the name goes to the delegated main(argv).
+    trend = commands.add_parser("trend", add_help=False, help="interactive sales trend (options as in queries.py)")
+    trend.set_defaults(load=load_trend, needs_settings=True, forward=True)
+
+    ingest = commands.add_parser("ingest", add_help=False,
+                                 help="insert synthetic products (options as in autoInsert.py)")
+    ingest.set_defaults(load=load_ingest, needs_settings=True, forward=True)
+
+    exporter = commands.add_parser("exporter", help="serve Prometheus metrics")
+    exporter.add_argument("--kind", choices=("weather", "kpi"), default="weather")
+    exporter.set_defaults(load=load_exporter, needs_settings=True, forward=False)
+
+    mesh = commands.add_parser("mesh", add_help=False,
+                               help="batch 3D model processing (options as in mesh_pipeline.py)")
+    mesh.set_defaults(load=load_mesh, needs_settings=False, forward=True)
+    return parser
+
+
+def parse_args(argv=None):
+    """Parse the command line; ``args.args`` holds what a forwarding subcommand passes on."""
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra[:1] == ["--"]:
+        extra = extra[1:]
+    if extra and not args.forward:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.args = extra
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if PREVIOUS_TASKS not in sys.path:
+        sys.path.insert(0, PREVIOUS_TASKS)
+
+    profiler = ImportProfiler()
+    if args.profile_startup:
+        profiler.start()
+    try:
+        if args.needs_settings:
+            with profiler.phase("settings"):
+                _settings()
+        with profiler.phase(f"import {args.command}"):
+            run = args.load(args)
+    finally:
+        profiler.stop()
+    if args.profile_startup:
+        profiler.report()
+    return run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The scripts import each other as top-level modules, as when run from their own directory.
+for path in (ROOT, os.path.join(ROOT, "pevious_tasks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
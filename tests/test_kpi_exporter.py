@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+pytest.importorskip("psycopg2")
+pytest.importorskip("pydantic_settings")
+
+from kpi_exporter import START, KpiAggregator
+
+
+class FakeAggregator(KpiAggregator):
+    """Reads from in-memory orders instead of the database."""
+
+    def __init__(self, **kwargs):
+        super().__init__(pool=None, batch_size=2, max_batches=10, statement_timeout_ms=0, **kwargs)
+        self.orders = {}  # order_id -> (purchased, [(payment_type, value)])
+        self.reviews = []
+        self.changes = 0
+
+    def _keys(self, after):
+        keys = sorted((purchased, order_id) for order_id, (purchased, _) in self.orders.items())
+        return [key for key in keys if after == START or key > after]
+
+    def _fetch_batch(self, query, after):
+        if "olist_order_reviews" in query:
+            return []
+        rows = []
+        for purchased, order_id in self._keys(after)[:self.batch_size]:
+            payments = self.orders[order_id][1]
+            if not payments:
+                rows.append((order_id, purchased, "SP", None, 0, 0))
+            for payment_type, value in payments:
+                rows.append((order_id, purchased, "SP", payment_type, 1, value))
+        return rows
+
+    def _count_before(self, stream, watermark):
+        if stream == "reviews":
+            return 0
+        return len(self._keys(START)) - len(self._keys(watermark))
+
+    def _source_changes_now(self):
+        return self.changes
+
+
+def day(n):
+    return datetime(2018, 1, n)
+
+
+def test_late_payment_is_counted():
+    agg = FakeAggregator()
+    agg.orders = {"a": (day(1), [("boleto", 10.0)]), "b": (day(2), []), "c": (day(3), [("voucher", 5.0)])}
+    agg.refresh()
+    assert agg.totals.month_orders == {"2018-01": 2}
+    assert agg.totals.watermarks["orders"] == (day(1), "a")
+
+    agg.orders["b"] = (day(2), [("credit_card", 20.0)])
+    agg.refresh()
+    assert agg.totals.month_orders == {"2018-01": 3}
+    assert agg.totals.month_revenue == {"2018-01": 35.0}
+    assert agg.totals.watermarks["orders"] == (day(3), "c")
+
+
+def test_unpaid_order_released_after_grace():
+    agg = FakeAggregator(payment_grace=0)
+    agg.orders = {"a": (day(1), []), "b": (day(2), [("boleto", 10.0)])}
+    agg.refresh()
+    assert agg.totals.watermarks["orders"] == (day(2), "b")
+    assert agg.totals.month_orders == {"2018-01": 1}
+
+
+def test_back_dated_order_triggers_rebuild():
+    agg = FakeAggregator()
+    agg.orders = {"b": (day(2), [("boleto", 10.0)])}
+    agg.refresh()
+    agg.orders["a"] = (day(1), [("boleto", 7.0)])
+    agg.refresh()
+    assert agg.totals.month_revenue == {"2018-01": 17.0}
+    assert agg.totals.rows_before["orders"] == 2
+
+
+def test_updates_trigger_rebuild():
+    agg = FakeAggregator()
+    agg.orders = {"a": (day(1), [("boleto", 10.0)])}
+    agg.refresh()
+    agg.orders["a"] = (day(1), [("boleto", 12.0)])
+    agg.changes += 1
+    agg.refresh()
+    assert agg.totals.payment_value == {"boleto": 12.0}
@@ -0,0 +1,81 @@
+import sys
+import textwrap
+
+import pytest
+
+import shopsight
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["ingest", "--rows", "10", "--rate", "0"], ["--rows", "10", "--rate", "0"]),
+    (["ingest", "--", "--rows", "10"], ["--rows", "10"]),
+    (["ingest", "-h"], ["-h"]),
+    (["ingest"], []),
+])
+def test_ingest_forwards_options(argv, expected):
+    args = shopsight.parse_args(argv)
+    assert args.command == "ingest"
+    assert args.args == expected
+
+
+def test_profile_startup_before_forwarding_subcommand():
+    args = shopsight.parse_args(["--profile-startup", "ingest", "--batch-size", "5"])
+    assert args.profile_startup
+    assert args.args == ["--batch-size", "5"]
+
+
+def test_mesh_forwards_options_and_paths():
+    args = shopsight.parse_args(["mesh", "--workers", "2", "a.obj"])
+    assert args.command == "mesh"
+    assert args.args == ["--workers", "2", "a.obj"]
+    assert not args.needs_settings
+
+
+def test_reports_options():
+    assert shopsight.parse_args(["reports", "--explain"]).explain
+    assert not shopsight.parse_args(["reports"]).explain
+
+
+def test_reports_rejects_unknown_options():
+    with pytest.raises(SystemExit) as exc:
+        shopsight.parse_args(["reports", "--rows", "10"])
+    assert exc.value.code == 2
+
+
+def test_exporter_kind():
+    assert shopsight.parse_args(["exporter"]).kind == "weather"
+    assert shopsight.parse_args(["exporter", "--kind", "kpi"]).kind == "kpi"
+    with pytest.raises(SystemExit):
+        shopsight.parse_args(["exporter", "--kind", "kpi", "--port", "1"])
+
+
+def test_profiler_bills_nested_imports_to_their_own_package(tmp_path, monkeypatch):
+    (tmp_path / "profiled_outer.py").write_text("import profiled_inner\n")
+    (tmp_path / "profiled_inner.py").write_text(textwrap.dedent("""
+        import time
+        time.sleep(0.2)
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("profiled_outer", "profiled_inner"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    profiler = shopsight.ImportProfiler()
+    profiler.start()
+    try:
+        import profiled_outer  # noqa: F401
+    finally:
+        profiler.stop()
+
+    assert profiler.timings["profiled_inner"] >= 0.2
+    assert profiler.timings["profiled_outer"] < 0.1
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["trend", "--show"], ["--show"]),
+    (["trend", "--output", "x.html", "--max-points", "500"], ["--output", "x.html", "--max-points", "500"]),
+    (["trend"], []),
+])
+def test_trend_forwards_options(argv, expected):
+    args = shopsight.parse_args(argv)
+    assert args.command == "trend"
+    assert args.args == expected
@@ -0,0 +1,95 @@
+import pytest
+
+from sql_runner import ScriptRunner, plan_stages, split_sql
+
+
+def test_descriptions_and_statements():
+    stmts = split_sql("""
+        -- First query
+        SELECT 1;
+        -- Second query
+        -- (details)
+        SELECT 2;
+    """)
+    assert [s["description"] for s in stmts] == ["First query", "Second query"]
+    assert [s["sql"] for s in stmts] == ["SELECT 1", "SELECT 2"]
+    assert [s["index"] for s in stmts] == [0, 1]
+
+
+def test_missing_description_and_trailing_statement():
+    stmts = split_sql("SELECT 1; SELECT 2")
+    assert [s["description"] for s in stmts] == ["SQL Query", "SQL Query"]
+    assert stmts[1]["sql"] == "SELECT 2"
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 'a;b'",
+    "SELECT E'it\\'s; fine'",
+    'SELECT 1 AS "a;b"',
+    "SELECT /* ; /* nested ; */ */ 1",
+    "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql",
+    "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql",
+])
+def test_semicolons_inside_tokens_do_not_split(sql):
+    stmts = split_sql(sql + "; SELECT 2;")
+    assert len(stmts) == 2
+    assert stmts[0]["sql"] == sql
+
+
+def test_read_only_and_autocommit_detection():
+    select, insert, index, cte_write = split_sql("""
+        SELECT 1;
+        INSERT INTO t VALUES (1);
+        CREATE INDEX CONCURRENTLY i ON t (a);
+        WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x;
+    """)
+    assert select["read_only"] and not select["autocommit"]
+    assert not insert["read_only"]
+    assert index["autocommit"]
+    assert not cte_write["read_only"]
+
+
+def test_hints():
+    stmt, = split_sql("""
+        -- Slow report
+        -- @timeout 5000
+        -- @parallel
+        SELECT 1;
+    """)
+    assert stmt["hints"] == {"timeout": 5000, "parallel": True}
+    assert stmt["hint_error"] is None
+    assert stmt["description"] == "Slow report"
+
+
+@pytest.mark.parametrize("hint, shown", [
+    ("-- @timeout", "no value"),
+    ("-- @timeout soon", "'soon'"),
+    ("-- @timeout 1.5", "'1.5'"),
+    ("-- @timeout -1", "'-1'"),
+])
+def test_invalid_timeout_hint_is_reported(hint, shown):
+    stmt, = split_sql(f"{hint}\nSELECT 1;")
+    assert "timeout" not in stmt["hints"]
+    assert shown in stmt["hint_error"]
+
+
+def test_barrier_hint_makes_statement_run_alone():
+    stmts = split_sql("SELECT 1; SELECT 2; -- @barrier\nSELECT 3; SELECT 4; UPDATE t SET a = 1; SELECT 5;")
+    stages = plan_stages(stmts)
+    assert [[s["index"] for s in stage] for stage in stages] == [[0, 1], [2], [3], [4], [5]]
+
+
+class _UnusedPool:
+    max_size = 1
+    db_params = {}
+
+    def connection(self):
+        raise AssertionError("a statement with an invalid hint must not check out a connection")
+
+
+def test_invalid_hint_fails_only_its_statement():
+    runner = ScriptRunner(_UnusedPool(), max_workers=1)
+    stmt, = split_sql("-- @timeout\nSELECT 1;")
+    result = runner.execute(stmt)
+    assert isinstance(result["error"], ValueError)
+    assert "@timeout" in str(result["error"])
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from voxel_stats import coarsen, voxel_keys, voxelize, voxelize_multi
+
+
+def test_voxel_keys_distinct_for_negative_indices():
+    ijk = np.array([[-1, -1, -1], [0, 0, -1], [-1, -1, -1]], dtype=np.int64)
+    keys = voxel_keys(ijk)
+    assert keys[0] == keys[2]
+    assert keys[0] != keys[1]
+
+
+def test_points_below_explicit_origin_stay_separate():
+    points = np.array([[-0.5, -0.5, -0.5], [0.5, 0.5, -0.5]])
+    result = voxelize(points, 1.0, origin=[0, 0, 0])
+    assert len(result["counts"]) == 2
+    assert sorted(map(tuple, result["indices"].tolist())) == [(-1, -1, -1), (0, 0, -1)]
+    assert result["counts"].tolist() == [1, 1]
+
+
+def test_default_origin_matches_open3d_grid():
+    # Open3D starts the grid half a voxel below the minimum corner.
+    points = np.array([[0.0, 0.0, 0.0], [0.4, 0.0, 0.0], [0.6, 0.0, 0.0]])
+    result = voxelize(points, 1.0)
+    assert np.allclose(result["origin"], [-0.5, -0.5, -0.5])
+    assert sorted(result["counts"].tolist()) == [1, 2]
+
+
+def test_empty_input_has_no_voxels():
+    result = voxelize(np.empty((0, 3)), 0.5)
+    assert len(result["counts"]) == 0
+    assert len(coarsen(result, 3)["counts"]) == 0
+
+
+def test_multi_coarsened_level_matches_direct():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 10, size=(5000, 3))
+    results = voxelize_multi(points, [0.5, 1.5])
+    direct = voxelize(points, 1.5)
+    assert np.array_equal(np.sort(results[1.5]["counts"]), np.sort(direct["counts"]))
+    assert np.allclose(results[1.5]["origin"], direct["origin"])
@@ -0,0 +1,175 @@
+"""Sparse voxel statistics in NumPy.
+
+Points are quantized to integer voxel coordinates and packed into one
+int64 key per point; a single argsort groups them and ``reduceat`` computes
+per-voxel counts, centroids and bounding extents. Results are flat arrays
+(one row per occupied voxel) instead of Open3D ``Voxel`` objects.
+
+By default the grid starts half a voxel below the points' minimum corner,
+as Open3D's ``VoxelGrid.create_from_point_cloud`` does, so voxel counts
+match the Open3D grid.
+
+Several voxel sizes can be computed in one sweep: when a size is an integer
+multiple of a smaller one and the two grids' boundaries line up, its voxels
+are aggregated from the smaller size's voxels instead of from the points
+again.
+"""
+import numpy as np
+
+AXIS_BITS = 21
+AXIS_LIMIT = 1 << AXIS_BITS
+
+
+def voxel_keys(ijk: np.ndarray) -> np.ndarray:
+    """Pack (i, j, k) voxel coordinates into one int64 per row.
+
+    Coordinates are offset by their per-axis minimum first, so indices below
+    an explicit origin (negative) still get distinct keys.
+    """
+    if not len(ijk):
+        return np.empty(0, dtype=np.int64)
+    ijk = ijk - ijk.min(axis=0)
+    dims = ijk.max(axis=0) + 1
+    if (dims <= AXIS_LIMIT).all():
+        return (ijk[:, 0] << (2 * AXIS_BITS)) | (ijk[:, 1] << AXIS_BITS) | ijk[:, 2]
+    if np.prod(dims.astype(float)) < 2 ** 63:
+        return np.ravel_multi_index(ijk.T, dims)
+    raise ValueError(f"Voxel grid of {tuple(dims)} cells is too large to index; use a bigger voxel size")
+
+
+def _group(keys: np.ndarray):
+    """Sort order and the start offset of each run of equal keys."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    return order, starts
+
+
+def default_origin(points: np.ndarray, voxel_size: float) -> np.ndarray:
+    """Open3D's grid origin: half a voxel below the minimum corner."""
+    if len(points) == 0:
+        return np.zeros(3)
+    return points.min(axis=0) - voxel_size / 2
+
+
+def _empty(voxel_size: float, origin) -> dict:
+    return {
+        "voxel_size": voxel_size,
+        "origin": origin,
+        "indices": np.empty((0, 3), dtype=np.int32),
+        "counts": np.empty(0, dtype=np.int64),
+        "centroids": np.empty((0, 3)),
+        "bbox_min": np.empty((0, 3)),
+        "bbox_max": np.empty((0, 3)),
+    }
+
+
+def voxelize(points: np.ndarray, voxel_size: float, origin=None) -> dict:
+    """Per-voxel statistics for ``points`` (N x 3).
+
+    ``origin`` defaults to ``default_origin``. Returns a dict of arrays with
+    one row per occupied voxel: ``indices`` (int32 i, j, k), ``counts``,
+    ``centroids``, ``bbox_min`` and ``bbox_max``.
+    """
+    points = np.asarray(points).reshape(-1, 3)
+    origin = default_origin(points, voxel_size) if origin is None else np.asarray(origin, dtype=float)
+    if len(points) == 0:
+        return _empty(voxel_size, origin)
+    ijk = np.floor((points - origin) / voxel_size).astype(np.int64)
+    order, starts = _group(voxel_keys(ijk))
+    counts = np.diff(np.append(starts, len(points)))
+
+    centroids = np.empty((len(starts), 3))
+    bbox_min = np.empty((len(starts), 3))
+    bbox_max = np.empty((len(starts), 3))
+    # One axis at a time keeps the sorted copy at N floats, not N x 3.
+    for axis in range(3):
+        column = points[order, axis]
+        centroids[:, axis] = np.add.reduceat(column, starts) / counts
+        bbox_min[:, axis] = np.minimum.reduceat(column, starts)
+        bbox_max[:, axis] = np.maximum.reduceat(column, starts)
+
+    return {
+        "voxel_size": voxel_size,
+        "origin": origin,
+        "indices": ijk[order[starts]].astype(np.int32),
+        "counts": counts,
+        "centroids": centroids,
+        "bbox_min": bbox_min,
+        "bbox_max": bbox_max,
+    }
+
+
+def coarsen(fine: dict, factor: int, shift: int = 0) -> dict:
+    """Aggregate a ``voxelize`` result into voxels ``factor`` times larger.
+
+    The coarse grid starts ``shift`` fine voxels below the fine origin.
+    """
+    origin = fine["origin"] - shift * fine["voxel_size"]
+    if len(fine["counts"]) == 0:
+        return _empty(fine["voxel_size"] * factor, origin)
+    ijk = (fine["indices"].astype(np.int64) + shift) // factor
+    order, starts = _group(voxel_keys(ijk))
+    fine_counts = fine["counts"][order]
+    counts = np.add.reduceat(fine_counts, starts)
+
+    centroids = np.empty((len(starts), 3))
+    bbox_min = np.empty((len(starts), 3))
+    bbox_max = np.empty((len(starts), 3))
+    for axis in range(3):
+        weighted = fine["centroids"][order, axis] * fine_counts
+        centroids[:, axis] = np.add.reduceat(weighted, starts) / counts
+        bbox_min[:, axis] = np.minimum.reduceat(fine["bbox_min"][order, axis], starts)
+        bbox_max[:, axis] = np.maximum.reduceat(fine["bbox_max"][order, axis], starts)
+
+    return {
+        "voxel_size": fine["voxel_size"] * factor,
+        "origin": origin,
+        "indices": ijk[order[starts]].astype(np.int32),
+        "counts": counts,
+        "centroids": centroids,
+        "bbox_min": bbox_min,
+        "bbox_max": bbox_max,
+    }
+
+
+def _is_integer(value: float) -> bool:
+    return abs(value - round(value)) < 1e-9
+
+
+def voxelize_multi(points: np.ndarray, voxel_sizes, origin=None) -> dict:
+    """``voxelize`` at several sizes; returns {voxel_size: result}.
+
+    With ``origin=None`` every size gets its own ``default_origin``, as
+    separate ``voxelize`` calls would.
+    """
+    points = np.asarray(points).reshape(-1, 3)
+    results = {}
+    finer = None
+    for size in sorted(set(voxel_sizes)):
+        size_origin = default_origin(points, size) if origin is None else np.asarray(origin, dtype=float)
+        factor = size / finer["voxel_size"] if finer is not None else 0
+        # Default origins sit half a voxel below the same corner, so the coarse
+        # grid starts (factor - 1) / 2 fine voxels lower; fine voxels nest in
+        # coarse ones only when that is a whole number (odd factors).
+        shift = (factor - 1) / 2 if origin is None else 0
+        if finer is not None and factor >= 2 and _is_integer(factor) and _is_integer(shift):
+            result = coarsen(finer, int(round(factor)), int(round(shift)))
+            result["voxel_size"] = size
+            result["origin"] = size_origin
+        else:
+            result = voxelize(points, size, size_origin)
+        results[size] = result
+        finer = result
+    return results
+
+
+def summarize(result: dict) -> dict:
+    counts = result["counts"]
+    return {
+        "voxel_size": result["voxel_size"],
+        "voxels": int(len(counts)),
+        "points": int(counts.sum()),
+        "max_points_per_voxel": int(counts.max()) if len(counts) else 0,
+        "mean_points_per_voxel": float(counts.mean()) if len(counts) else 0.0,
+    }
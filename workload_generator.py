@@ -0,0 +1,256 @@
+"""Referentially consistent synthetic Olist workload for scale testing.
+
+Generates sellers, customers, orders, order items, payments and reviews at a
+multiple of the original Olist volumes, using the Olist marginal
+distributions for customer state, order status, payment type, installments,
+item count and review score. Orders are split into shards that parallel
+worker processes load with COPY, one transaction per shard, so every shard
+is self-contained (customer -> order -> items/payments/review).
+
+    python workload_generator.py --scale 10 --workers 4
+"""
+import argparse
+import hashlib
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from multiprocessing import Pool, util
+
+import psycopg2
+
+from autoInsert import PRODUCT_COLUMNS, copy_rows, generate_products
+from config import settings
+
+# Row counts of the public Olist dataset (scale factor 1).
+OLIST_BASE = {
+    "orders": 99441,
+    "sellers": 3095,
+    "products": 32951,
+}
+
+STATE_WEIGHTS = {
+    "SP": 41.98, "RJ": 12.92, "MG": 11.70, "RS": 5.50, "PR": 5.07, "SC": 3.66, "BA": 3.40,
+    "DF": 2.15, "ES": 2.04, "GO": 2.03, "PE": 1.66, "CE": 1.34, "PA": 0.98, "MT": 0.91,
+    "MA": 0.75, "MS": 0.72, "PB": 0.54, "PI": 0.50, "RN": 0.49, "AL": 0.42, "SE": 0.35,
+    "TO": 0.28, "RO": 0.25, "AM": 0.15, "AC": 0.08, "AP": 0.07, "RR": 0.05,
+}
+STATE_CITIES = {
+    "SP": "sao paulo", "RJ": "rio de janeiro", "MG": "belo horizonte", "RS": "porto alegre",
+    "PR": "curitiba", "SC": "florianopolis", "BA": "salvador", "DF": "brasilia", "ES": "vitoria",
+    "GO": "goiania", "PE": "recife", "CE": "fortaleza", "PA": "belem", "MT": "cuiaba",
+    "MA": "sao luis", "MS": "campo grande", "PB": "joao pessoa", "PI": "teresina", "RN": "natal",
+    "AL": "maceio", "SE": "aracaju", "TO": "palmas", "RO": "porto velho", "AM": "manaus",
+    "AC": "rio branco", "AP": "macapa", "RR": "boa vista",
+}
+# Sellers are far more concentrated in the south-east than customers.
+SELLER_STATE_WEIGHTS = {"SP": 59.7, "PR": 11.3, "MG": 7.9, "SC": 6.1, "RJ": 5.5, "RS": 4.0, "GO": 1.3, "DF": 1.0,
+                        "ES": 0.8, "BA": 0.6, "CE": 0.4, "PE": 0.3, "MT": 0.2, "MS": 0.2, "RN": 0.2, "PB": 0.2}
+ORDER_STATUS_WEIGHTS = {"delivered": 97.0, "shipped": 1.1, "canceled": 0.6, "unavailable": 0.6,
+                        "invoiced": 0.3, "processing": 0.3}
+PAYMENT_TYPE_WEIGHTS = {"credit_card": 73.9, "boleto": 19.0, "voucher": 5.6, "debit_card": 1.5}
+INSTALLMENT_WEIGHTS = {1: 50.6, 2: 11.9, 3: 10.1, 4: 6.8, 5: 5.0, 6: 3.8, 7: 1.6, 8: 4.1, 9: 0.6, 10: 5.5}
+ITEM_COUNT_WEIGHTS = {1: 90.1, 2: 7.6, 3: 1.3, 4: 0.5, 5: 0.2, 6: 0.3}
+REVIEW_SCORE_WEIGHTS = {5: 57.7, 4: 19.3, 1: 11.5, 3: 8.2, 2: 3.2}
+REVIEW_RATE = 0.99
+REPEAT_CUSTOMER_RATE = 0.03
+
+PERIOD_START = datetime(2016, 9, 1)
+PERIOD_END = datetime(2018, 10, 1)
+
+CUSTOMER_COLUMNS = ("customer_id", "customer_unique_id", "customer_zip_code_prefix",
+                    "customer_city", "customer_state")
+SELLER_COLUMNS = ("seller_id", "seller_zip_code_prefix", "seller_city", "seller_state")
+ORDER_COLUMNS = ("order_id", "customer_id", "order_status", "order_purchase_timestamp",
+                 "order_approved_at", "order_delivered_carrier_date",
+                 "order_delivered_customer_date", "order_estimated_delivery_date")
+ITEM_COLUMNS = ("order_id", "order_item_id", "product_id", "seller_id", "shipping_limit_date",
+                "price", "freight_value")
+PAYMENT_COLUMNS = ("order_id", "payment_sequential", "payment_type", "payment_installments",
+                   "payment_value")
+REVIEW_COLUMNS = ("review_id", "order_id", "review_score", "review_comment_title",
+                  "review_comment_message", "review_creation_date", "review_answer_timestamp")
+
+
+def make_id(run_tag, kind, n):
+    """Deterministic 32-char hex id, unique per run tag, entity kind and index."""
+    return hashlib.md5(f"{run_tag}:{kind}:{n}".encode()).hexdigest()
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _skewed_index(rng, size, skew=3.0):
+    # A few products/sellers get most of the sales, as in the real data.
+    return min(int(size * rng.random() ** skew), size - 1)
+
+
+def _ts(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value is not None else None
+
+
+def generate_sellers(run_tag, count, seed=0):
+    rng = random.Random(f"{run_tag}:sellers:{seed}")
+    rows = []
+    for n in range(count):
+        state = _weighted(rng, SELLER_STATE_WEIGHTS)
+        rows.append((make_id(run_tag, "seller", n), f"{rng.randint(1000, 99999):05d}",
+                     STATE_CITIES[state], state))
+    return rows
+
+
+def generate_shard(run_tag, shard, first_order, order_count, seller_count, product_ids):
+    """Build every row for orders ``first_order .. first_order + order_count - 1``."""
+    rng = random.Random(f"{run_tag}:shard:{shard}")
+    customers, orders, items, payments, reviews = [], [], [], [], []
+    span = (PERIOD_END - PERIOD_START).total_seconds()
+    unique_ids = []
+
+    for n in range(first_order, first_order + order_count):
+        order_id = make_id(run_tag, "order", n)
+        customer_id = make_id(run_tag, "customer", n)
+        state = _weighted(rng, STATE_WEIGHTS)
+        if unique_ids and rng.random() < REPEAT_CUSTOMER_RATE:
+            unique_id = rng.choice(unique_ids)
+        else:
+            unique_id = make_id(run_tag, "unique", n)
+            unique_ids.append(unique_id)
+        customers.append((customer_id, unique_id, f"{rng.randint(1000, 99999):05d}",
+                          STATE_CITIES[state], state))
+
+        # sqrt() skews purchases towards the end of the period (the business grows).
+        purchased = PERIOD_START + timedelta(seconds=span * math.sqrt(rng.random()))
+        status = _weighted(rng, ORDER_STATUS_WEIGHTS)
+        approved = purchased + timedelta(hours=rng.expovariate(1 / 10))
+        estimated = purchased + timedelta(days=rng.randint(15, 35))
+        carrier = delivered = None
+        if status in ("delivered", "shipped"):
+            carrier = approved + timedelta(days=rng.expovariate(1 / 3))
+        if status == "delivered":
+            delivered = carrier + timedelta(days=rng.gammavariate(2.0, 4.5))
+        orders.append((order_id, customer_id, status, _ts(purchased),
+                       _ts(approved if status != "canceled" else None),
+                       _ts(carrier), _ts(delivered), _ts(estimated)))
+
+        order_total = 0.0
+        for item_no in range(1, _weighted(rng, ITEM_COUNT_WEIGHTS) + 1):
+            price = round(min(rng.lognormvariate(4.3, 0.9), 6700.0), 2)
+            freight = round(min(rng.lognormvariate(2.8, 0.5), 400.0), 2)
+            order_total += price + freight
+            items.append((order_id, item_no,
+                          product_ids[_skewed_index(rng, len(product_ids))],
+                          make_id(run_tag, "seller", _skewed_index(rng, seller_count)),
+                          _ts(approved + timedelta(days=6)), price, freight))
+
+        payment_type = _weighted(rng, PAYMENT_TYPE_WEIGHTS)
+        # Vouchers are often split across several payments.
+        parts = rng.randint(1, 3) if payment_type == "voucher" else 1
+        remaining = round(order_total, 2)
+        for seq in range(1, parts + 1):
+            value = remaining if seq == parts else round(remaining * rng.uniform(0.2, 0.8), 2)
+            remaining = round(remaining - value, 2)
+            installments = _weighted(rng, INSTALLMENT_WEIGHTS) if payment_type == "credit_card" else 1
+            payments.append((order_id, seq, payment_type, installments, value))
+
+        if rng.random() < REVIEW_RATE:
+            created = (delivered or estimated) + timedelta(days=1)
+            reviews.append((make_id(run_tag, "review", n), order_id, _weighted(rng, REVIEW_SCORE_WEIGHTS),
+                            None, None, _ts(created), _ts(created + timedelta(days=rng.expovariate(1 / 3)))))
+
+    return {
+        "olist_customers": (CUSTOMER_COLUMNS, customers),
+        "olist_orders": (ORDER_COLUMNS, orders),
+        "olist_order_items": (ITEM_COLUMNS, items),
+        "olist_order_payments": (PAYMENT_COLUMNS, payments),
+        "olist_order_reviews": (REVIEW_COLUMNS, reviews),
+    }
+
+
+# Per-process state for pool workers.
+_worker = {}
+
+
+def _init_worker(run_tag, seller_count, product_ids):
+    _worker["conn"] = psycopg2.connect(settings.DATABASE_URL)
+    # Pool workers skip atexit; multiprocessing runs this when the worker exits normally.
+    util.Finalize(None, _worker["conn"].close, exitpriority=10)
+    _worker["run_tag"] = run_tag
+    _worker["seller_count"] = seller_count
+    _worker["product_ids"] = product_ids
+
+
+def _load_shard(task):
+    shard, first_order, order_count = task
+    tables = generate_shard(_worker["run_tag"], shard, first_order, order_count,
+                            _worker["seller_count"], _worker["product_ids"])
+    conn = _worker["conn"]
+    # Dict order is parent-before-child, so foreign keys hold inside the transaction.
+    with conn.cursor() as cur:
+        for table, (columns, rows) in tables.items():
+            if rows:
+                copy_rows(cur, table, columns, rows)
+    conn.commit()
+    return {table: len(rows) for table, (_, rows) in tables.items()}
+
+
+def run(scale=1.0, workers=4, shard_size=5000, run_tag=None):
+    run_tag = run_tag or uuid.uuid4().hex[:8]
+    order_total = max(1, int(OLIST_BASE["orders"] * scale))
+    seller_count = max(1, int(OLIST_BASE["sellers"] * scale))
+    started = time.perf_counter()
+
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT product_id FROM olist_products LIMIT %s", (settings.WORKLOAD_PRODUCT_SAMPLE,))
+            product_ids = [row[0] for row in cur.fetchall()]
+            if not product_ids:
+                products = generate_products(max(1, int(OLIST_BASE["products"] * scale)))
+                copy_rows(cur, "olist_products", PRODUCT_COLUMNS, products)
+                product_ids = [row[0] for row in products]
+            copy_rows(cur, "olist_sellers", SELLER_COLUMNS, generate_sellers(run_tag, seller_count))
+        conn.commit()
+    finally:
+        conn.close()
+
+    tasks = [
+        (shard, first, min(shard_size, order_total - first))
+        for shard, first in enumerate(range(0, order_total, shard_size))
+    ]
+    print(f"Run {run_tag}: scale {scale}x -> {order_total} orders, {seller_count} sellers, "
+          f"{len(tasks)} shards on {workers} workers")
+
+    totals = {"olist_sellers": seller_count}
+    with Pool(workers, initializer=_init_worker, initargs=(run_tag, seller_count, product_ids)) as pool:
+        for done, counts in enumerate(pool.imap_unordered(_load_shard, tasks), start=1):
+            for table, count in counts.items():
+                totals[table] = totals.get(table, 0) + count
+            elapsed = time.perf_counter() - started
+            print(f"  shard {done}/{len(tasks)} loaded, {totals['olist_orders'] / elapsed:.0f} orders/s")
+        # Let the workers exit on their own so their connections are closed;
+        # leaving the block would terminate them instead.
+        pool.close()
+        pool.join()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    print(f"Done in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s):")
+    for table, count in totals.items():
+        print(f"  {table}: {count}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a scaled synthetic Olist workload")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of the Olist volume (e.g. 1, 10, 100)")
+    parser.add_argument("--workers", type=int, default=settings.WORKLOAD_WORKERS, help="parallel writer processes")
+    parser.add_argument("--shard-size", type=int, default=settings.WORKLOAD_SHARD_SIZE, help="orders per transaction")
+    parser.add_argument("--run-tag", help="reuse a tag to regenerate the same ids and values")
+    args = parser.parse_args()
+    run(args.scale, args.workers, args.shard_size, args.run_tag)
+
+
+if __name__ == "__main__":
+    main()